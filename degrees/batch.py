@@ -0,0 +1,125 @@
+import argparse
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py [directory] [--input FILE] [--output FILE] [--processes N]",
+        description="Answer many source/target queries, one tab-separated "
+                    "pair of names or person ids per input line, as JSON Lines."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", default="-", help="file of pairs (default: stdin)")
+    parser.add_argument("--output", default="-", help="file for results (default: stdout)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--policy", choices=degrees.RANKING_POLICIES,
+                        help="pick between people sharing a name by this policy")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="match names that are not found exactly to the closest names")
+    parser.add_argument("--dicts", action="store_true",
+                        help="hold the dataset in dictionaries instead of CSR arrays")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files instead of using the binary snapshot")
+    args = parser.parse_args()
+
+    dataset = (args.directory, not args.dicts, not args.no_snapshot)
+    _load(*dataset)
+
+    infile = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with infile:
+        pairs = read_pairs(infile)
+
+    outfile = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    with outfile:
+        records = solve_pairs(pairs, processes=args.processes, dataset=dataset,
+                              policy=args.policy, fuzzy=args.fuzzy)
+        for record in records:
+            outfile.write(json.dumps(record) + "\n")
+
+
+def read_pairs(lines):
+    """
+    Parse tab-separated source/target pairs, skipping blank lines.
+    """
+    pairs = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        source, _, target = line.partition("\t")
+        pairs.append((source.strip(), target.strip()))
+    return pairs
+
+
+def solve_pairs(pairs, processes=None, dataset=None, policy=None, fuzzy=False):
+    """
+    Yields one result dictionary per (source, target) pair, in order.
+    Names are resolved as by degrees.resolve_person with `policy` and
+    `fuzzy`.
+
+    Pairs are grouped by source so each source needs only one
+    breadth-first search, and the groups are shared out over a pool of
+    `processes` workers. Where processes can be forked, the workers
+    share the parent's already loaded graph copy-on-write; otherwise
+    each reloads `dataset`, a (directory, compact_backend, use_snapshot)
+    tuple, at startup.
+    """
+    results = [None] * len(pairs)
+    groups = {}
+    for i, (source, target) in enumerate(pairs):
+        try:
+            source_id = degrees.resolve_person(source, policy, fuzzy)
+            target_id = degrees.resolve_person(target, policy, fuzzy)
+        except LookupError as e:
+            results[i] = {"source": source, "target": target, "error": e.args[0]}
+            continue
+        groups.setdefault(source_id, {}).setdefault(target_id, []).append(i)
+
+    tasks = [(source_id, list(targets)) for source_id, targets in groups.items()]
+    for source_id, paths in _map(tasks, processes, dataset):
+        for target_id, path in paths.items():
+            for i in groups[source_id][target_id]:
+                source, target = pairs[i]
+                results[i] = {
+                    "source": source,
+                    "target": target,
+                    "degrees": None if path is None else len(path),
+                    "path": path
+                }
+
+    yield from results
+
+
+def _map(tasks, processes, dataset):
+    if processes == 1 or len(tasks) <= 1:
+        yield from map(_paths_from, tasks)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    elif dataset is not None:
+        context = multiprocessing.get_context()
+        initializer, initargs = _load, dataset
+    else:
+        raise ValueError("workers that cannot fork need a dataset to load")
+    with context.Pool(processes, initializer=initializer, initargs=initargs) as pool:
+        yield from pool.imap_unordered(_paths_from, tasks)
+
+
+def _paths_from(task):
+    source_id, target_ids = task
+    return source_id, degrees.shortest_paths_from(source_id, target_ids)
+
+
+def _load(directory, compact_backend, use_snapshot):
+    degrees.load_data(directory, compact_backend=compact_backend, use_snapshot=use_snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import degrees
+import snapshot
+from util import SearchStats
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python benchmark.py directory [--queries N] [--seed S] [--methods ...] "
+              "[--output FILE] [--baseline FILE]",
+        description="Measure loading and shortest-path queries on a dataset."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--methods", nargs="+", choices=degrees.METHODS, default=["bfs", "bidirectional"])
+    parser.add_argument("--landmarks", type=int, default=16,
+                        help="landmarks to load when benchmarking astar")
+    parser.add_argument("--dicts", action="store_true",
+                        help="hold the dataset in dictionaries instead of CSR arrays")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files instead of using the binary snapshot")
+    parser.add_argument("--output", default="-", help="file for the JSON results (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    args = parser.parse_args()
+
+    results = run(args.directory, queries=args.queries, seed=args.seed, methods=args.methods,
+                  compact_backend=not args.dicts, use_snapshot=not args.no_snapshot,
+                  landmarks=args.landmarks)
+
+    encoded = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(encoded)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(encoded + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            changes = list(compare(baseline, results))
+        except ValueError as e:
+            parser.exit(1, f"Cannot compare with {args.baseline}: {e}\n")
+        for name, old, new in changes:
+            change = "n/a" if not old else f"{(new - old) / old:+.1%}"
+            print(f"{name}: {old} -> {new} ({change})", file=sys.stderr)
+
+
+def run(directory, queries=200, seed=0, methods=("bfs", "bidirectional"),
+        compact_backend=True, use_snapshot=True, landmarks=16):
+    """
+    Load `directory` and time `queries` shortest-path queries with each
+    of `methods`, returning the measurements as a JSON-ready dictionary.
+
+    The queries are a fixed sample of source/target pairs drawn with
+    `seed`, so runs on the same dataset are comparable. The load is
+    always timed parsing the CSV files, whether or not a snapshot
+    exists from an earlier run; with the snapshot in use, writing it
+    and memory-mapping it back are timed separately.
+    """
+    start = time.perf_counter()
+    stats = degrees.load_data(directory, compact_backend=compact_backend, use_snapshot=False)
+    load_seconds = time.perf_counter() - start
+
+    snapshot_seconds = warm_seconds = None
+    if compact_backend and use_snapshot:
+        start = time.perf_counter()
+        snapshot.save(directory, degrees.compact, degrees.components)
+        snapshot_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        degrees.load_data(directory, compact_backend=True, use_snapshot=True)
+        warm_seconds = time.perf_counter() - start
+
+    landmark_seconds = None
+    if "astar" in methods:
+        start = time.perf_counter()
+        degrees.load_landmarks(directory, count=landmarks)
+        landmark_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    pairs = [tuple(rng.sample(person_ids, 2)) for _ in range(queries)]
+
+    results = {
+        "directory": os.path.abspath(directory),
+        "dataset": stats,
+        "config": {
+            "queries": queries,
+            "seed": seed,
+            "backend": "compact" if compact_backend else "dicts",
+            "snapshot": use_snapshot,
+            "landmarks": landmarks if "astar" in methods else None
+        },
+        "load": {
+            "seconds": load_seconds,
+            "snapshot_seconds": snapshot_seconds,
+            "warm_seconds": warm_seconds,
+            "landmark_seconds": landmark_seconds
+        },
+        "methods": {},
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+    for method in methods:
+        results["methods"][method] = measure(pairs, method)
+    results["peak_rss_bytes"] = peak_rss()
+    return results
+
+
+def measure(pairs, method):
+    """
+    Time every pair with one search method and total up the people it
+    expanded, the casts and edges it scanned, and its largest frontier.
+    """
+    latencies = []
+    lengths = []
+    totals = {"nodes_expanded": 0, "movies_scanned": 0, "edges_scanned": 0}
+    peak_frontier = 0
+    for source, target in pairs:
+        stats = SearchStats()
+        path = degrees.shortest_path(source, target, method=method, stats=stats)
+        latencies.append(stats.seconds)
+        lengths.append(None if path is None else len(path))
+        for name in totals:
+            totals[name] += getattr(stats, name)
+        peak_frontier = max(peak_frontier, stats.peak_frontier)
+
+    connected = [length for length in lengths if length is not None]
+    return {
+        "connected": len(connected),
+        "mean_degrees": statistics.fmean(connected) if connected else None,
+        **totals,
+        "peak_frontier": peak_frontier,
+        "latency_ms": summarize([latency * 1000 for latency in latencies])
+    }
+
+
+def summarize(values):
+    if not values:
+        return None
+    if len(values) == 1:
+        percentiles = values * 99
+    else:
+        percentiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "mean": statistics.fmean(values),
+        "p50": percentiles[49],
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "max": max(values)
+    }
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of this process in bytes,
+    or None where the platform cannot tell.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def compare(baseline, results):
+    """
+    Yield (name, old, new) for each headline measurement found in both
+    a baseline and new results.
+
+    Raise ValueError if the two were run with a different `config`,
+    since their queries, and so their totals and latencies, differ.
+    """
+    old_config, new_config = baseline.get("config", {}), results["config"]
+    differences = sorted(
+        name for name in old_config.keys() | new_config.keys()
+        if old_config.get(name) != new_config.get(name)
+    )
+    if differences:
+        raise ValueError(f"runs differ in config: {', '.join(differences)}")
+
+    pairs = [
+        (f"load.{name}", baseline["load"].get(name), results["load"].get(name))
+        for name in ("seconds", "snapshot_seconds", "warm_seconds")
+    ]
+    pairs.append(("peak_rss_bytes", baseline["peak_rss_bytes"], results["peak_rss_bytes"]))
+    for method, new in results["methods"].items():
+        old = baseline["methods"].get(method)
+        if old is None:
+            continue
+        pairs.append((f"{method}.nodes_expanded", old["nodes_expanded"], new["nodes_expanded"]))
+        if old["latency_ms"] is None or new["latency_ms"] is None:
+            continue
+        for percentile in ("p50", "p90", "p99"):
+            pairs.append((f"{method}.latency_ms.{percentile}",
+                          old["latency_ms"][percentile], new["latency_ms"][percentile]))
+    for name, old, new in pairs:
+        if old is not None and new is not None:
+            yield name, old, new
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sys
+from collections import OrderedDict
+
+# Rough cost of one entry of a parent tree: its dictionary slot, the
+# (movie, parent) tuple and the integer key objects it holds
+ENTRY_BYTES = 3 * 8 + sys.getsizeof((0, 0)) + 2 * sys.getsizeof(2 ** 20)
+
+
+class TreeCache():
+    """
+    Least-recently-used cache of complete breadth-first search trees,
+    keyed by the source person they were grown from.
+
+    Each tree maps every person reachable from its source to the
+    (movie, parent) pair that reached them. Trees are evicted oldest
+    first until their estimated total size is under `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.trees = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, source):
+        """
+        Return the tree for `source`, or None if it is not cached.
+        """
+        tree = self.trees.get(source)
+        if tree is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.trees.move_to_end(source)
+        return tree
+
+    def put(self, source, tree):
+        """
+        Cache `tree` for `source`, evicting least recently used trees
+        to make room. A tree bigger than the whole budget is not kept.
+        """
+        size = tree_bytes(tree)
+        if size > self.max_bytes:
+            return
+        if source in self.trees:
+            self.bytes -= tree_bytes(self.trees.pop(source))
+        while self.trees and self.bytes + size > self.max_bytes:
+            _, evicted = self.trees.popitem(last=False)
+            self.bytes -= tree_bytes(evicted)
+            self.evictions += 1
+        self.trees[source] = tree
+        self.bytes += size
+
+    def fits(self, people):
+        """
+        Return whether a tree over `people` people could be kept at all.
+        """
+        return people * ENTRY_BYTES <= self.max_bytes
+
+    def discard(self, sources):
+        """
+        Drop the trees of `sources`, which may be a generator over `trees`.
+        """
+        for source in list(sources):
+            self.bytes -= tree_bytes(self.trees.pop(source))
+
+    def clear(self):
+        self.trees.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            "trees": len(self.trees),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def tree_bytes(tree):
+    return sys.getsizeof(tree) + len(tree) * ENTRY_BYTES
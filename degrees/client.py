@@ -0,0 +1,84 @@
+import argparse
+import json
+import socket
+import sys
+
+
+class DegreesClient():
+    """
+    Blocking client for server.py: sends one request at a time and
+    waits for its reply.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None, timeout=None):
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port))
+        self.socket.settimeout(timeout)
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, message):
+        """
+        Send one request dictionary and return the reply dictionary.
+        """
+        return self.request_line(json.dumps(message))
+
+    def request_line(self, line):
+        """
+        Send one request already encoded as a line of JSON and return
+        the reply dictionary.
+        """
+        self.file.write(line.strip().encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    def path(self, source, target, method="bidirectional", trace=False):
+        return self.request({"op": "path", "source": source, "target": target, "method": method,
+                             "trace": trace})
+
+    def resolve(self, name):
+        return self.request({"op": "resolve", "name": name})
+
+    def search(self, query, limit=10):
+        return self.request({"op": "search", "query": query, "limit": limit})
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+    def update(self, directory):
+        return self.request({"op": "update", "directory": directory})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python client.py [--host HOST] [--port PORT | --unix PATH] < requests",
+        description="Send JSON Lines requests from stdin to server.py and print the replies."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    args = parser.parse_args()
+
+    with DegreesClient(args.host, args.port, args.unix) as client:
+        for line in sys.stdin:
+            if line.strip():
+                print(json.dumps(client.request_line(line)))
+
+
+if __name__ == "__main__":
+    main()
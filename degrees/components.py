@@ -0,0 +1,130 @@
+from array import array
+
+from graph import person_positions
+
+
+class ComponentIndex():
+    """
+    Connected components of the co-star graph.
+
+    `labels[person]` numbers the component of each person, keyed the
+    same way as the graph it was built from, with component 0 the
+    largest when built; `sizes[label]` counts the people in each
+    component.
+
+    People and credits added later keep the labels read-only: a new
+    person gets a new label in `added`, and a component joined into
+    another is recorded in `merged` and its size set to 0.
+    """
+
+    def __init__(self, labels, sizes):
+        self.labels = labels
+        self.sizes = sizes
+        self.added = {}
+        self.merged = {}
+
+    @classmethod
+    def build(cls, graph):
+        """
+        Label the components of `graph` by union-find, joining the
+        stars of each movie into one set.
+        """
+        people = list(graph.persons())
+        positions = person_positions(people)
+        parent = array("i", range(len(people)))
+
+        def find(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        for movie in graph.films():
+            first = None
+            for star in graph.stars_of(movie):
+                root = find(star if positions is None else positions[star])
+                if first is None:
+                    first = root
+                elif root != first:
+                    parent[root] = first
+
+        # Number the components from largest to smallest
+        roots = array("i", (find(position) for position in range(len(people))))
+        counts = {}
+        for root in roots:
+            counts[root] = counts.get(root, 0) + 1
+        ranked = sorted(counts, key=lambda root: (-counts[root], root))
+        label_of = {root: label for label, root in enumerate(ranked)}
+        sizes = array("i", (counts[root] for root in ranked))
+
+        if positions is None:
+            labels = array("i", (label_of[root] for root in roots))
+        else:
+            labels = {person: label_of[root] for person, root in zip(people, roots)}
+        return cls(labels, sizes)
+
+    def component(self, person):
+        if person in self.added:
+            label = self.added[person]
+        else:
+            label = self.labels[person]
+        if self.merged:
+            label = self.find(label)
+        return label
+
+    def connected(self, a, b):
+        return self.component(a) == self.component(b)
+
+    def size(self, person):
+        return self.sizes[self.component(person)]
+
+    def find(self, label):
+        """
+        Return the label that `label` has been merged into, if any.
+        """
+        merged = self.merged
+        while label in merged:
+            if merged[label] in merged:
+                merged[label] = merged[merged[label]]
+            label = merged[label]
+        return label
+
+    def add_person(self, person):
+        """
+        Give a new person a component of their own.
+        """
+        sizes = self._mutable_sizes()
+        self.added[person] = len(sizes)
+        sizes.append(1)
+
+    def union(self, a, b):
+        """
+        Join the components of two people, now that they share a movie,
+        and return whether they were apart.
+        """
+        first, second = self.component(a), self.component(b)
+        if first == second:
+            return False
+        sizes = self._mutable_sizes()
+        if sizes[first] < sizes[second]:
+            first, second = second, first
+        self.merged[second] = first
+        sizes[first] += sizes[second]
+        sizes[second] = 0
+        return True
+
+    def _mutable_sizes(self):
+        # Sizes read from a snapshot are a read-only view
+        if not isinstance(self.sizes, array):
+            self.sizes = array("i", self.sizes)
+        return self.sizes
+
+    def stats(self):
+        """
+        Summarize the component sizes for load statistics.
+        """
+        return {
+            "components": sum(1 for size in self.sizes if size),
+            "largest_component": max(self.sizes, default=0),
+            "isolated_people": sum(1 for size in self.sizes if size == 1)
+        }
@@ -1,7 +1,16 @@
+import argparse
 import csv
+import heapq
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import landmarks
+import snapshot
+from cache import TreeCache
+from components import ComponentIndex
+from graph import CompactGraph, CountingGraph, DictGraph, MoviesView, NamesView, PeopleView
+from nameindex import NameIndex
+from util import Node, DequeQueueFrontier, SearchStats
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +21,69 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CSR graph, when load_data was asked for the compact backend
+compact = None
 
-def load_data(directory):
+# Breadth-first search trees by source person, once enable_cache has been called
+tree_cache = None
+
+# Landmark distances for A* search, once load_landmarks has been called
+oracle = None
+
+# Connected component of every person, labelled by load_data
+components = None
+
+# Whether apply_delta has added anything since load_data, so that the
+# loaded graph no longer matches the CSV files on disk
+_delta_applied = False
+
+# Prefix and typo-tolerant index of names, built on first use by name_index
+_name_index = None
+
+# Called with the SearchStats of every shortest_path while set
+stats_hook = None
+
+# Orders for choosing between people who share a name: "films" puts the
+# most credited first, "birth" the earliest born; ties go to the lowest id
+RANKING_POLICIES = ("films", "birth")
+
+# Search strategies that shortest_path takes as its method
+METHODS = ("bfs", "bidirectional", "astar")
+
+
+def load_data(directory, compact_backend=False, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    With `compact_backend`, the data is held in a `CompactGraph` and
+    `names`, `people` and `movies` become read-only views over it.
+    Unless `use_snapshot` is false, that graph is memory-mapped from a
+    binary snapshot next to the CSV files, which is (re)written whenever
+    the files have changed since it was taken.
+
+    Also labels the connected components, and returns load statistics.
     """
+    global names, people, movies, compact, oracle, components, _name_index, _delta_applied
+
+    # Cached trees and landmark positions are keyed by the old backend's people
+    if tree_cache is not None:
+        tree_cache.clear()
+    oracle = None
+    _name_index = None
+    _delta_applied = False
+
+    if compact_backend:
+        if use_snapshot:
+            compact, components = snapshot.load_or_build(directory)
+        else:
+            compact = CompactGraph.from_csv(directory)
+            components = ComponentIndex.build(compact)
+        names, people, movies = NamesView(compact), PeopleView(compact), MoviesView(compact)
+        return load_stats()
+    # Start afresh, as a delta may have been applied to the last load
+    compact = None
+    names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,25 +118,160 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    components = ComponentIndex.build(current_graph())
+    return load_stats()
+
+
+def apply_delta(directory):
+    """
+    Add the rows of whichever of people.csv, movies.csv and stars.csv
+    are in `directory` to the loaded dataset, without reloading it.
+
+    Ids that are already loaded are skipped, as are credits naming
+    unknown people or movies, so applying a delta twice changes nothing.
+    Component labels and the name index are updated in place; cached
+    search trees are dropped only for components that gained a credit,
+    and landmark distances are recomputed in memory. Files on disk,
+    including the snapshot and the landmark distances, are left as they
+    are, even by a later load_landmarks.
+
+    Returns how many people, movies and stars were added.
+    """
+    global oracle, _delta_applied
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"no such directory: {directory}")
+    graph = current_graph()
+    added = {"people": 0, "movies": 0, "stars": 0}
+
+    for row in _delta_rows(directory, "people.csv"):
+        if _known(graph.key, row["id"]):
+            continue
+        new_name = row["name"].lower() not in names
+        person = graph.add_person(row["id"], row["name"], row["birth"])
+        if components is not None:
+            components.add_person(person)
+        if new_name and _name_index is not None:
+            _name_index.add(row["name"].lower())
+        added["people"] += 1
+
+    for row in _delta_rows(directory, "movies.csv"):
+        if not _known(graph.movie_key, row["id"]):
+            graph.add_movie(row["id"], row["title"], row["year"])
+            added["movies"] += 1
+
+    touched = set()
+    for row in _delta_rows(directory, "stars.csv"):
+        try:
+            person, movie = graph.key(row["person_id"]), graph.movie_key(row["movie_id"])
+        except KeyError:
+            continue
+        # Read the cast first: every star of a movie shares one component
+        costar = next(iter(graph.stars_of(movie)), None)
+        if not graph.add_credit(person, movie):
+            continue
+        added["stars"] += 1
+        if components is not None:
+            touched.add(components.component(person))
+            if costar is not None:
+                touched.add(components.component(costar))
+                components.union(person, costar)
+
+    if tree_cache is not None and added["stars"]:
+        # A new credit can only shorten paths within the component it joins
+        if components is None:
+            tree_cache.clear()
+        else:
+            touched = {components.find(label) for label in touched}
+            tree_cache.discard(source for source in tree_cache.trees
+                               if components.component(source) in touched)
+    if any(added.values()):
+        _delta_applied = True
+    if oracle is not None and (added["people"] or added["stars"]):
+        # The saved distances are keyed by the CSV files, which a delta
+        # does not change, so the new ones are kept in memory only
+        oracle = landmarks.LandmarkOracle.build(graph, oracle.count, oracle.strategy)
+    return added
+
+
+def _delta_rows(directory, filename):
+    try:
+        f = open(f"{directory}/{filename}", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        yield from csv.DictReader(f)
+
+
+def _known(lookup, key):
+    try:
+        lookup(key)
+    except KeyError:
+        return False
+    return True
+
+
+def load_stats():
+    """
+    Returns the sizes of the loaded dataset and of its components.
+    """
+    stats = {"people": len(people), "movies": len(movies)}
+    stats.update(components.stats())
+    return stats
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [--dicts] [--no-snapshot] [--landmarks N] "
+              "[--estimate] [--delta DIR ...]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--dicts", action="store_true",
+                        help="hold the dataset in dictionaries instead of CSR arrays")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files instead of using the binary snapshot")
+    parser.add_argument("--landmarks", type=int, default=None, metavar="N",
+                        help="search by A* guided by N landmark people")
+    parser.add_argument("--estimate", action="store_true",
+                        help="only print the landmark estimate of the degrees of separation")
+    parser.add_argument("--policy", choices=RANKING_POLICIES,
+                        help="pick between people sharing a name by this policy instead of asking")
+    parser.add_argument("--delta", action="append", default=[], metavar="DIR",
+                        help="after loading, add the people, movies and stars in DIR's CSV files")
+    args = parser.parse_args()
+    if args.landmarks is not None and args.landmarks < 1:
+        parser.error("--landmarks must be at least 1")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    stats = load_data(args.directory, compact_backend=not args.dicts,
+                      use_snapshot=not args.no_snapshot)
+    if args.landmarks or args.estimate:
+        load_landmarks(args.directory, count=args.landmarks or 16)
+    for delta in args.delta:
+        added = apply_delta(delta)
+        print(f"Added {added['people']} people, {added['movies']} movies "
+              f"and {added['stars']} stars from {delta}.")
+        stats = load_stats()
     print("Data loaded.")
+    print(f"{stats['people']} people and {stats['movies']} movies in {stats['components']} "
+          f"components; the largest has {stats['largest_component']} people.")
 
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
+    source = _person_or_exit(input("Name: "), args.policy)
+    target = _person_or_exit(input("Name: "), args.policy)
 
-    path = shortest_path(source, target)
+    if args.estimate:
+        estimate = estimated_degrees(source, target)
+        if estimate is None:
+            print("Not connected.")
+        elif estimate[0] == estimate[1]:
+            print(f"{estimate[0]} degrees of separation.")
+        elif estimate[1] is None:
+            print(f"At least {estimate[0]} degrees of separation.")
+        else:
+            print(f"Between {estimate[0]} and {estimate[1]} degrees of separation.")
+        return
+
+    path = shortest_path(source, target, method="astar" if args.landmarks else "bidirectional")
 
     if path is None:
         print("Not connected.")
@@ -84,21 +286,151 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def enable_cache(max_bytes=256 * 2 ** 20):
+    """
+    Start caching a complete search tree for each source person,
+    keeping at most about `max_bytes` of trees, and return the cache.
+
+    Once a source's tree is cached, every shortest_path from it is
+    answered by walking back up the tree, without searching.
+    """
+    global tree_cache
+    tree_cache = TreeCache(max_bytes)
+    return tree_cache
+
+
+def load_landmarks(directory, count=16, strategy="degree"):
+    """
+    Load the landmark distances saved next to the dataset in `directory`,
+    computing and saving them first if needed, and return them.
+
+    `strategy` is "degree" or "coverage"; see LandmarkOracle.build.
+
+    Once a delta has been applied, the saved distances are keyed by CSV
+    files that leave it out, so they are computed afresh in memory and
+    neither read nor written.
+    """
+    global oracle
+    if _delta_applied:
+        oracle = landmarks.LandmarkOracle.build(current_graph(), count, strategy)
+    else:
+        oracle = landmarks.load_or_build(directory, current_graph(), count, strategy)
+    return oracle
+
+
+def estimated_degrees(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people from the landmark distances alone, without searching.
+    `upper` is None if no landmark reaches both people.
+
+    If no possible path, returns None.
+    """
+    if oracle is None:
+        raise RuntimeError("estimated_degrees needs load_landmarks() first")
+    if not connected(source, target):
+        return None
+    graph = current_graph()
+    return oracle.estimate(graph.key(source), graph.key(target))
+
+
+def connected(source, target):
+    """
+    Returns whether any path connects the source and the target,
+    from the component labels alone; before any are labelled,
+    assumes that one might.
+    """
+    if components is None:
+        return True
+    graph = current_graph()
+    return components.connected(graph.key(source), graph.key(target))
+
+
+def _person_or_exit(name, policy):
+    person_id = person_id_for_name(name, policy)
+    if person_id is not None:
+        return person_id
+    suggestions = [people[person_id]["name"] for person_id in find_people(name, limit=3)]
+    if suggestions:
+        sys.exit(f"Person not found. Did you mean {' or '.join(suggestions)}?")
+    sys.exit("Person not found.")
+
+
+def current_graph():
+    """
+    Returns the search adapter for whichever backend is loaded.
+    """
+    if compact is not None:
+        return compact
+    return DictGraph(people, movies, names)
+
+
+def shortest_path(source, target, method="bfs", stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    `method` selects the search strategy: "bfs" grows a single
+    frontier out of the source, "bidirectional" grows frontiers out
+    of both the source and the target until they meet, and "astar"
+    is guided towards the target by the landmarks from load_landmarks.
+
     If no possible path, returns None.
+
+    When the cache is enabled, the method is ignored and the path is
+    read from the source's cached search tree. On a miss, that tree is
+    grown over the source's whole component, with no early exit, and
+    cached; but if a tree of that component would not fit in the cache
+    at all, the path is searched for by `method` instead, uncached.
+    People in different components are answered without searching.
+
+    If `stats` is a SearchStats, it is filled in with what the search
+    did, as is a new one passed to `stats_hook` when that is set.
+    Without either, nothing is counted or timed.
     """
+    if stats is None and stats_hook is not None:
+        stats = SearchStats()
+    if stats is None:
+        return _shortest_path(source, target, method, None)
+    stats.start(method)
+    path = _shortest_path(source, target, method, stats)
+    stats.finish(path)
+    if stats_hook is not None:
+        stats_hook(stats)
+    return path
+
+
+def _shortest_path(source, target, method, stats):
+    if not connected(source, target):
+        if stats is not None:
+            stats.method = "components"
+        return None
+    graph = current_graph()
+    if graph.key(source) == graph.key(target):
+        return []
+    if tree_cache is not None and _cacheable(graph.key(source)):
+        return _cached_path(source, target, stats)
+    if method == "bidirectional":
+        return bidirectional_path(source, target, stats)
+    if method == "astar":
+        return astar_path(source, target, stats)
+    if method != "bfs":
+        raise ValueError(f"unknown search method: {method!r}")
+
+    graph = _search_graph(stats)
+    source, target = graph.key(source), graph.key(target)
 
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
 
-    # Intialize empty explored set
+    # Intialize empty explored set, and the set of movies whose casts have been scanned
     explored = set()
+    scanned = set()
+
+    # The last node of the layer being expanded, when counting layers
+    tail = start
 
     # Keep looping until solution found
     while True:
@@ -114,11 +446,8 @@ def shortest_path(source, target):
         # Add node to explored set
         explored.add(node.state)
 
-        # Find all neighbors for current node
-        neighbors = neighbors_for_person(node.state)
-
         # Loop through all neighbors of current node
-        for movie, actor in neighbors:
+        for movie, actor in _neighbors(graph, node.state, scanned):
 
             # Expands node if not already eplored and current state of node is not equal to actor
             if not frontier.contains_state(actor) and actor not in explored:
@@ -129,13 +458,16 @@ def shortest_path(source, target):
                 # If childe node is target, gets path
                 if child.state == target:
 
+                    if stats is not None:
+                        stats.layer(len(frontier.frontier), len(explored))
+
                     path = []
                     node = child
 
                     # Loops backwards through the path
                     while node.parent is not None:
 
-                        path.append((node.action, node.state))
+                        path.append((graph.movie_id(node.action), graph.person_id(node.state)))
                         node = node.parent
 
                     # Reverses path
@@ -148,15 +480,444 @@ def shortest_path(source, target):
 
                     frontier.add(child)
 
+        # Ends the layer after its last node, whose last child ends the next
+        if stats is not None and node is tail:
+            stats.layer(len(frontier.frontier), len(explored))
+            tail = None if frontier.empty() else frontier.frontier[-1]
+
+
+def bidirectional_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both ends at once.
+
+    If no possible path, returns None.
+    """
+    graph = _search_graph(stats)
+    source, target = graph.key(source), graph.key(target)
+    if source == target:
+        return []
+
+    # Each side maps a reached person to the (movie, person) edge
+    # that reached it, and records how many degrees away from its root it is
+    parents = ({source: None}, {target: None})
+    depths = ({source: 0}, {target: 0})
+    scanned = (set(), set())
+    layers = ([source], [target])
+
+    while layers[0] and layers[1]:
+
+        # Always grow the smaller frontier by one whole layer
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        other = 1 - side
+        seen, other_seen = parents[side], parents[other]
+        depth = depths[side]
+        next_layer = []
+        meetings = []
+
+        for person in layers[side]:
+            for movie, neighbor in _neighbors(graph, person, scanned[side]):
+                if neighbor in seen:
+                    continue
+                seen[neighbor] = (movie, person)
+                depth[neighbor] = depth[person] + 1
+                next_layer.append(neighbor)
+                if neighbor in other_seen:
+                    meetings.append(neighbor)
+
+        if stats is not None:
+            stats.layer(len(next_layer) + len(layers[other]), len(seen) + len(other_seen))
+
+        # The first layer that touches the other side holds the shortest
+        # path, but it runs through whichever meeting point is closest overall
+        if meetings:
+            meeting = min(
+                meetings,
+                key=lambda person: depths[0][person] + depths[1][person]
+            )
+            return _join_paths(graph, parents[0], parents[1], meeting)
+
+        layers = (next_layer, layers[1]) if side == 0 else (layers[0], next_layer)
+
+    return None
+
+
+def astar_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, by A* search using the
+    landmark lower bounds as its heuristic.
+
+    If no possible path, returns None.
+    """
+    if oracle is None:
+        raise RuntimeError("A* search needs load_landmarks() first")
+    graph = _search_graph(stats)
+    source, target = graph.key(source), graph.key(target)
+    target_profile = oracle.profile(target)
+    bound = oracle.lower_bound(source, target_profile)
+    if bound is None:
+        return None
+
+    # The landmark bound is consistent, so a person's first pop is final;
+    # ties go to the deepest person, which is nearest the target
+    parents = {source: None}
+    costs = {source: 0}
+    done = set()
+    heap = [(bound, 0, source)]
+    while heap:
+        _, depth, person = heapq.heappop(heap)
+        cost = -depth
+        if person in done:
+            continue
+        if stats is not None:
+            stats.frontier(len(heap) + 1)
+            stats.explored = len(done)
+        if person == target:
+            return _trace_path(graph, parents, person)
+        done.add(person)
+
+        for movie, neighbor in _neighbors(graph, person):
+            if neighbor in done or costs.get(neighbor, cost + 2) <= cost + 1:
+                continue
+            bound = oracle.lower_bound(neighbor, target_profile)
+            if bound is None:
+                continue
+            parents[neighbor] = (movie, person)
+            costs[neighbor] = cost + 1
+            heapq.heappush(heap, (cost + 1 + bound, -cost - 1, neighbor))
+
+    return None
+
 
-def person_id_for_name(name):
+def shortest_paths_from(source, targets):
+    """
+    Returns a dictionary mapping each person_id in `targets` to the
+    shortest list of (movie_id, person_id) pairs that connect the source
+    to it, or to None if there is no possible path.
+
+    All targets are answered by a single breadth-first search from the
+    source, which stops as soon as the last of them has been reached.
+    """
+    graph = current_graph()
+    source = graph.key(source)
+    remaining = {graph.key(target): target for target in targets}
+    paths = {}
+    for person in list(remaining):
+        if components is not None and not components.connected(source, person):
+            paths[remaining.pop(person)] = None
+    if source in remaining:
+        paths[remaining.pop(source)] = []
+
+    parents = {source: None}
+    scanned = set()
+    layer = [source]
+    while layer and remaining:
+        next_layer = []
+        for person in layer:
+            for movie, neighbor in _neighbors(graph, person, scanned):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie, person)
+                next_layer.append(neighbor)
+                if neighbor in remaining:
+                    path = _trace_path(graph, parents, neighbor)
+                    paths[remaining.pop(neighbor)] = path
+        layer = next_layer
+
+    for target in remaining.values():
+        paths[target] = None
+    return paths
+
+
+def all_shortest_paths(source, target):
+    """
+    Lazily yields every shortest list of (movie_id, person_id) pairs
+    that connect the source to the target; two people who starred in
+    several movies together are joined once through each of them.
+
+    A single breadth-first search records, for everybody up to the
+    target's depth, which people one layer nearer the source reached
+    them and through which movies. Paths are then walked back from the
+    target through that layered graph one at a time, so taking the
+    first few costs no more than one search however many there are.
+
+    If no possible path, yields nothing.
+    """
+    graph = current_graph()
+    source, target = graph.key(source), graph.key(target)
+    if components is not None and not components.connected(source, target):
+        return
+    parents = _layered_parents(graph, source, target)
+    if parents is None:
+        return
+    for path in _layered_paths(parents, source, target):
+        yield [(graph.movie_id(movie), graph.person_id(person)) for movie, person in path]
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Lazily yields up to `k` (or, if None, all) lists of (movie_id,
+    person_id) pairs that connect the source to the target without
+    visiting anybody twice, shortest first.
+
+    Follows Yen's algorithm: each path after the first is the shortest
+    that leaves an earlier one at some person, found by searching on
+    from there without the people before it or the moves the earlier
+    paths made from it. Raises ValueError if `k` is negative.
+    """
+    if k is not None and k < 0:
+        raise ValueError("k must not be negative")
+    if k == 0:
+        return
+    graph = current_graph()
+    source, target = graph.key(source), graph.key(target)
+    if components is not None and not components.connected(source, target):
+        return
+    parents = _layered_parents(graph, source, target)
+    if parents is None:
+        return
+
+    path = next(_layered_paths(parents, source, target))
+    found = [path]
+    candidates = []
+    seen = {tuple(path)}
+    counter = 0
+    while True:
+        yield [(graph.movie_id(movie), graph.person_id(person)) for movie, person in path]
+        if k is not None and len(found) == k:
+            return
+
+        for i in range(len(path)):
+            root = path[:i]
+            spur = root[-1][1] if root else source
+            banned_people = {source}.union(person for _, person in root)
+            banned_people.discard(spur)
+            banned_moves = {other[i] for other in found if other[:i] == root}
+            spur_path = _spur_path(graph, spur, target, banned_people, banned_moves)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heapq.heappush(candidates, (len(candidate), counter, candidate))
+                counter += 1
+
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+
+
+def _layered_parents(graph, source, target):
+    """
+    Searches breadth-first from the source to the end of the target's
+    layer, returning a map of each person reached to the (movie,
+    parents) pairs that reached them, where `parents` lists the stars
+    of the movie one layer nearer the source; or None if the target
+    cannot be reached.
+    """
+    depth = {source: 0}
+    parents = {}
+    scanned = set()
+    layer = [source]
+    d = 0
+    while layer and target not in depth:
+        d += 1
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if movie in scanned:
+                    continue
+                scanned.add(movie)
+
+                # A movie is scanned from the first of its stars to be
+                # expanded, so none of them is nearer than d - 1
+                stars = graph.stars_of(movie)
+                before = [star for star in stars if depth.get(star) == d - 1]
+                for star in stars:
+                    reached = depth.get(star)
+                    if reached is None:
+                        depth[star] = d
+                        parents[star] = [(movie, before)]
+                        next_layer.append(star)
+                    elif reached == d:
+                        parents[star].append((movie, before))
+        layer = next_layer
+    if target not in depth:
+        return None
+    return parents
+
+
+def _layered_paths(parents, source, person):
+    """
+    Yields each (movie, person) path from the source to `person`
+    through a map built by _layered_parents.
+    """
+    if person == source:
+        yield []
+        return
+    for movie, before in parents[person]:
+        for parent in before:
+            for path in _layered_paths(parents, source, parent):
+                path.append((movie, person))
+                yield path
+
+
+def _spur_path(graph, source, target, banned_people, banned_moves):
+    """
+    Returns the shortest (movie, person) path from the source to the
+    target that avoids `banned_people` and does not begin with any of
+    `banned_moves`, or None.
+    """
+    parents = {source: None}
+    parents.update((person, None) for person in banned_people)
+    scanned = set()
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if movie in scanned:
+                    continue
+                if person == source and any(move[0] == movie for move in banned_moves):
+                    # Leave the movie unscanned, so that others can still
+                    # reach through it whoever the source may not
+                    for star in graph.stars_of(movie):
+                        if star not in parents and (movie, star) not in banned_moves:
+                            parents[star] = (movie, person)
+                            next_layer.append(star)
+                    continue
+                scanned.add(movie)
+                for star in graph.stars_of(movie):
+                    if star not in parents:
+                        parents[star] = (movie, person)
+                        next_layer.append(star)
+        if target in parents:
+            path = []
+            person = target
+            while person != source:
+                movie, parent = parents[person]
+                path.append((movie, person))
+                person = parent
+            path.reverse()
+            return path
+        layer = next_layer
+    return None
+
+
+def search_tree(source):
+    """
+    Returns a dictionary mapping every person_id connected to the
+    source to the (movie_id, person_id) pair that first reached them
+    in a breadth-first search; the source itself maps to None.
+    """
+    graph = current_graph()
+    tree = _search_tree(graph, graph.key(source))
+    return {
+        graph.person_id(person): None if edge is None
+        else (graph.movie_id(edge[0]), graph.person_id(edge[1]))
+        for person, edge in tree.items()
+    }
+
+
+def _search_tree(graph, source, stats=None):
+    parents = {source: None}
+    scanned = set()
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person in layer:
+            for movie, neighbor in _neighbors(graph, person, scanned):
+                if neighbor not in parents:
+                    parents[neighbor] = (movie, person)
+                    next_layer.append(neighbor)
+        layer = next_layer
+        if stats is not None:
+            stats.layer(len(layer), len(parents))
+    return parents
+
+
+def _cached_path(source, target, stats=None):
+    """
+    Answers shortest_path from the cached search tree of the source,
+    searching the whole of the source's component on a miss. The method
+    in `stats` becomes "tree" for such a search, or "cache" for a hit,
+    whichever method was asked for.
+    """
+    graph = _search_graph(stats)
+    source, target = graph.key(source), graph.key(target)
+    tree = tree_cache.get(source)
+    if tree is None:
+        if stats is not None:
+            stats.method = "tree"
+        tree = _search_tree(graph, source, stats)
+        tree_cache.put(source, tree)
+    elif stats is not None:
+        stats.method = "cache"
+    if target not in tree:
+        return None
+    return _trace_path(graph, tree, target)
+
+
+def _cacheable(source):
+    """
+    Returns whether the search tree of the source is, or could be, cached.
+    """
+    if source in tree_cache.trees or components is None:
+        return True
+    return tree_cache.fits(components.size(source))
+
+
+def _search_graph(stats):
+    """
+    Returns the search adapter, counting into `stats` unless it is None.
+    """
+    graph = current_graph()
+    return graph if stats is None else CountingGraph(graph, stats)
+
+
+def _trace_path(graph, parents, person):
+    """
+    Follows a map of person -> (movie, parent) back to its root and
+    returns the (movie_id, person_id) path from the root to `person`.
+    """
+    path = []
+    while parents[person] is not None:
+        movie, parent = parents[person]
+        path.append((graph.movie_id(movie), graph.person_id(person)))
+        person = parent
+    path.reverse()
+    return path
+
+
+def _join_paths(graph, forward, backward, meeting):
+    """
+    Stitches the source-side and target-side parent maps of a
+    bidirectional search into one path through `meeting`.
+    """
+    path = _trace_path(graph, forward, meeting)
+
+    person = meeting
+    while backward[person] is not None:
+        movie, next_person = backward[person]
+        path.append((graph.movie_id(movie), graph.person_id(next_person)))
+        person = next_person
+    return path
+
+
+def person_id_for_name(name, policy=None):
     """
     Returns the IMDB id for a person's name,
-    resolving ambiguities as needed.
+    resolving ambiguities as needed: by asking, or
+    by a ranking policy if one is given.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
+    elif len(person_ids) > 1 and policy is not None:
+        return rank_people(person_ids, policy)[0]
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
@@ -175,17 +936,121 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def resolve_person(value, policy=None, fuzzy=False):
+    """
+    Returns the IMDB id for a person_id or a name, without asking;
+    raises LookupError if there is none.
+
+    A name shared by several people is resolved by the ranking `policy`,
+    or is an error without one. With `fuzzy`, a name that matches nobody
+    exactly resolves to the closest names within two typos.
+    """
+    if value in people:
+        return value
+    person_ids = names.get(value.lower(), set())
+    if not person_ids and fuzzy:
+        matches = name_index().fuzzy(value)
+        closest = [name for name, edits in matches if edits == matches[0][1]]
+        person_ids = set().union(*(names[name] for name in closest))
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    if person_ids and policy is not None:
+        return rank_people(person_ids, policy)[0]
+    if person_ids:
+        raise LookupError(f"ambiguous name: {value}")
+    raise LookupError(f"person not found: {value}")
+
+
+def find_people(query, limit=10, policy="films"):
+    """
+    Returns up to `limit` person_ids for a partial or misspelt name:
+    exact matches first, then names starting with the query, then names
+    within two typos of it, each group ordered by the ranking `policy`.
+    """
+    index = name_index()
+    found = []
+    groups = (
+        [query.lower()] if query.lower() in names else [],
+        index.prefix(query, limit),
+        [name for name, _ in index.fuzzy(query, limit=limit)]
+    )
+    for group in groups:
+        person_ids = set()
+        for name in group:
+            person_ids.update(names[name])
+        for person_id in rank_people(person_ids - set(found), policy):
+            found.append(person_id)
+            if len(found) == limit:
+                return found
+    return found
+
+
+def rank_people(person_ids, policy="films"):
+    """
+    Returns `person_ids` ordered by one of the RANKING_POLICIES.
+    """
+    graph = current_graph()
+    if policy == "films":
+        def rank(person_id):
+            return -len(graph.movies_of(graph.key(person_id))), person_id
+    elif policy == "birth":
+        def rank(person_id):
+            birth = people[person_id]["birth"]
+            return (0, int(birth)) if birth.isdigit() else (1, 0), person_id
+    else:
+        raise ValueError(f"unknown ranking policy: {policy!r}")
+    return sorted(person_ids, key=rank)
+
+
+def name_index():
+    """
+    Returns the index of names for prefix and fuzzy lookups,
+    building it the first time it is needed.
+    """
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex(names)
+    return _name_index
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    return set(iter_neighbors_for_person(person_id))
+
+
+def iter_neighbors_for_person(person_id, scanned=None):
+    """
+    Lazily yields (movie_id, person_id) pairs for people
+    who starred with a given person.
+
+    If `scanned` is a set, movies already in it are skipped and every
+    movie yielded from is added to it, so that across calls sharing the
+    set each movie's cast is only ever read once.
+    """
+    graph = current_graph()
+    for movie, person in _neighbors(graph, graph.key(person_id), scanned):
+        yield graph.movie_id(movie), graph.person_id(person)
+
+
+def _neighbors(graph, person, scanned=None):
+    """
+    Yields (movie, person) pairs for people who starred with `person`,
+    as keys of `graph`, skipping and then recording movies in `scanned`.
+
+    In a breadth-first search, every star of a movie is reached the
+    first time any of its cast is expanded, so scanning the same cast
+    again from a later co-star can never find anyone new.
+    """
+    for movie in graph.movies_of(person):
+        if scanned is not None:
+            if movie in scanned:
+                continue
+            scanned.add(movie)
+        for star in graph.stars_of(movie):
+            yield movie, star
 
 
 if __name__ == "__main__":
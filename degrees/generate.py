@@ -0,0 +1,121 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+
+FIRST_NAMES = (
+    "Ada", "Alan", "Alice", "Amir", "Ana", "Ben", "Carla", "Chen", "Dana", "David",
+    "Elena", "Emma", "Farah", "Grace", "Hana", "Ivan", "James", "Jin", "Kate", "Kofi",
+    "Laura", "Leo", "Maria", "Mei", "Nadia", "Omar", "Paul", "Priya", "Rosa", "Sam",
+    "Sara", "Tom", "Uma", "Victor", "Wei", "Yusuf", "Zoe"
+)
+LAST_NAMES = (
+    "Abbott", "Bacon", "Becker", "Cruise", "Diaz", "Elwes", "Fischer", "Garcia", "Hanks",
+    "Ito", "Jensen", "Khan", "Kim", "Lopez", "Martin", "Nguyen", "Okafor", "Park", "Quinn",
+    "Rossi", "Silva", "Smith", "Tanaka", "Ueda", "Varga", "Walsh", "Watson", "Xu", "Young",
+    "Zhang"
+)
+TITLE_WORDS = (
+    "Apollo", "Bride", "City", "Dark", "Echo", "Forest", "Ghost", "Harbor", "Island",
+    "Journey", "Kingdom", "Last", "Midnight", "Night", "Ocean", "Princess", "Queen", "River",
+    "Silent", "Storm", "Time", "Under", "Violet", "Winter", "Year", "Zero"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python generate.py directory [--people N] [--movies N] [--seed S]",
+        description="Write a synthetic people/movies/stars dataset with power-law "
+                    "cast sizes and filmographies."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=None,
+                        help="number of movies (default: a third of the people)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cast-exponent", type=float, default=2.5,
+                        help="power-law exponent of cast sizes")
+    parser.add_argument("--max-cast", type=int, default=200)
+    parser.add_argument("--activity-exponent", type=float, default=1.8,
+                        help="Pareto exponent of how many movies a person appears in")
+    args = parser.parse_args()
+
+    movies = args.movies if args.movies is not None else max(1, args.people // 3)
+    stars = generate(args.directory, args.people, movies, seed=args.seed,
+                     cast_exponent=args.cast_exponent, max_cast=args.max_cast,
+                     activity_exponent=args.activity_exponent)
+    print(f"Wrote {args.people} people, {movies} movies and {stars} stars to {args.directory}.")
+
+
+def generate(directory, people, movies, seed=0, cast_exponent=2.5, max_cast=200,
+             activity_exponent=1.8):
+    """
+    Write people.csv, movies.csv and stars.csv for a synthetic dataset
+    into `directory`, and return the number of stars written.
+
+    Cast sizes follow a discrete power law with exponent `cast_exponent`,
+    from 1 up to `max_cast`. Each person gets a Pareto-distributed
+    activity with exponent `activity_exponent`, and casts are drawn in
+    proportion to it, so filmographies are heavy-tailed too, with a few
+    hub actors appearing in a great many movies. As in IMDB, everybody
+    listed has at least one credit: people left out of every cast are
+    added to a random movie at the end. The same arguments always
+    produce the same files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    person_ids = [str(100 + 7 * i) for i in range(people)]
+    movie_ids = [str(1000000 + 13 * i) for i in range(movies)]
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        f.write("id,name,birth\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for person_id in person_ids:
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.5:
+                name = f"{name} {rng.choice(LAST_NAMES)}"
+            birth = rng.randint(1900, 2005) if rng.random() < 0.8 else ""
+            writer.writerow([int(person_id), name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        f.write("id,title,year\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for movie_id in movie_ids:
+            title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+            writer.writerow([int(movie_id), title, rng.randint(1920, 2020)])
+
+    # Drawing from cumulative activity is a binary search per star
+    activity = itertools.accumulate(rng.paretovariate(activity_exponent) for _ in range(people))
+    cumulative = list(activity)
+    population = range(people)
+
+    count = 0
+    credited = bytearray(people)
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id in movie_ids:
+            size = min(power_law(rng, cast_exponent), max_cast, people)
+            cast = set(rng.choices(population, cum_weights=cumulative, k=size))
+            for person in sorted(cast):
+                writer.writerow([person_ids[person], movie_id])
+                credited[person] = 1
+            count += len(cast)
+        for person in population:
+            if not credited[person]:
+                writer.writerow([person_ids[person], rng.choice(movie_ids)])
+                count += 1
+    return count
+
+
+def power_law(rng, exponent):
+    """
+    Draw an integer of at least 1 from a power law with the given
+    exponent, which must be greater than 1.
+    """
+    return int((1 - rng.random()) ** (-1 / (exponent - 1)))
+
+
+if __name__ == "__main__":
+    main()
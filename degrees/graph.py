@@ -0,0 +1,478 @@
+import csv
+import heapq
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+class DictGraph():
+    """
+    Search adapter over the `people`, `movies` and `names` dictionaries
+    built by `load_data`. Keys are the IMDB id strings themselves.
+    """
+
+    def __init__(self, people, movies, names=None):
+        self.people = people
+        self.movies = movies
+        self.names = names
+
+    def key(self, person_id):
+        if person_id not in self.people:
+            raise KeyError(person_id)
+        return person_id
+
+    def movie_key(self, movie_id):
+        if movie_id not in self.movies:
+            raise KeyError(movie_id)
+        return movie_id
+
+    def persons(self):
+        return iter(self.people)
+
+    def films(self):
+        return iter(self.movies)
+
+    def person_id(self, person):
+        return person
+
+    def movie_id(self, movie):
+        return movie
+
+    def movies_of(self, person):
+        return self.people[person]["movies"]
+
+    def stars_of(self, movie):
+        return self.movies[movie]["stars"]
+
+    def add_person(self, person_id, name, birth):
+        self.people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        self.names.setdefault(name.lower(), set()).add(person_id)
+        return person_id
+
+    def add_movie(self, movie_id, title, year):
+        self.movies[movie_id] = {"title": title, "year": year, "stars": set()}
+        return movie_id
+
+    def add_credit(self, person, movie):
+        """
+        Record that `person` starred in `movie`; returns whether that is new.
+        """
+        if movie in self.people[person]["movies"]:
+            return False
+        self.people[person]["movies"].add(movie)
+        self.movies[movie]["stars"].add(person)
+        return True
+
+
+class CompactGraph():
+    """
+    Integer-indexed graph of people and movies.
+
+    People and movies are numbered 0..n-1 in file order. Who starred in
+    what is held as two CSR adjacency tables of int32 arrays: the movies
+    of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are likewise `movie_stars[movie_offsets[m]:...]`.
+    IMDB ids are found again by binary search over the `*_order` arrays,
+    which list indexes sorted by id (or by lower-cased name), so no
+    per-id dictionaries are kept.
+
+    The arrays are never changed once built, and may be memory-mapped
+    read-only. People, movies and credits added later by `add_person`,
+    `add_movie` and `add_credit` are kept in small dictionaries on top.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_order, movie_order, name_order):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.movie_offsets = movie_offsets
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_order = name_order
+
+        # Slicing a memoryview gives a view of the adjacency range, not a copy
+        self.person_movies = memoryview(person_movies)
+        self.movie_stars = memoryview(movie_stars)
+
+        # Additions since the arrays were built
+        self.base_people = len(person_ids)
+        self.base_movies = len(movie_ids)
+        self.added_people = {}
+        self.added_movies = {}
+        self.added_names = {}
+        self.added_credits = {}
+        self.added_stars = {}
+        self.version = 0
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Build a compact graph from the people, movies and stars
+        CSV files in `directory`.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Interning maps are only needed while reading the stars file
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        edge_people, edge_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+        del person_index, movie_index
+
+        person_offsets, person_movies = _csr(len(person_ids), edge_people, edge_movies)
+        del edge_people, edge_movies
+        movie_offsets, movie_stars = _transpose(len(movie_ids), person_offsets, person_movies)
+
+        return cls(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            person_offsets, person_movies, movie_offsets, movie_stars,
+            _order(person_ids), _order(movie_ids),
+            _order([name.lower() for name in person_names])
+        )
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def key(self, person_id):
+        try:
+            return _lookup(self.person_order, self.person_ids, person_id)
+        except KeyError:
+            if person_id in self.added_people:
+                return self.added_people[person_id]
+            raise
+
+    def movie_key(self, movie_id):
+        try:
+            return _lookup(self.movie_order, self.movie_ids, movie_id)
+        except KeyError:
+            if movie_id in self.added_movies:
+                return self.added_movies[movie_id]
+            raise
+
+    def keys_for_name(self, name):
+        """
+        Return the indexes of every person whose lower-cased name is `name`.
+        """
+        order, names = self.name_order, self.person_names
+        i = bisect_left(order, name, key=lambda person: names[person].lower())
+        matches = []
+        while i < len(order) and names[order[i]].lower() == name:
+            matches.append(order[i])
+            i += 1
+        return matches + self.added_names.get(name, [])
+
+    def persons(self):
+        return iter(range(self.num_people))
+
+    def films(self):
+        return iter(range(self.num_movies))
+
+    def person_id(self, person):
+        return self.person_ids[person]
+
+    def movie_id(self, movie):
+        return self.movie_ids[movie]
+
+    def movies_of(self, person):
+        # People added since the arrays were built have no row in them
+        if person >= self.base_people:
+            return [*self.added_credits.get(person, ())]
+        offsets = self.person_offsets
+        base = self.person_movies[offsets[person]:offsets[person + 1]]
+        added = self.added_credits.get(person)
+        return base if added is None else [*base, *added]
+
+    def stars_of(self, movie):
+        if movie >= self.base_movies:
+            return [*self.added_stars.get(movie, ())]
+        offsets = self.movie_offsets
+        base = self.movie_stars[offsets[movie]:offsets[movie + 1]]
+        added = self.added_stars.get(movie)
+        return base if added is None else [*base, *added]
+
+    def add_person(self, person_id, name, birth):
+        """
+        Add a person after the built arrays, returning their index.
+        """
+        for attribute, value in (("person_ids", person_id), ("person_names", name),
+                                 ("person_births", birth)):
+            _appendable(self, attribute).append(value)
+        person = self.num_people - 1
+        self.added_people[person_id] = person
+        self.added_names.setdefault(name.lower(), []).append(person)
+        self.version += 1
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Add a movie after the built arrays, returning its index.
+        """
+        for attribute, value in (("movie_ids", movie_id), ("movie_titles", title),
+                                 ("movie_years", year)):
+            _appendable(self, attribute).append(value)
+        movie = self.num_movies - 1
+        self.added_movies[movie_id] = movie
+        self.version += 1
+        return movie
+
+    def add_credit(self, person, movie):
+        """
+        Record that `person` starred in `movie`; returns whether that is new.
+        """
+        if movie in self.movies_of(person):
+            return False
+        self.added_credits.setdefault(person, []).append(movie)
+        self.added_stars.setdefault(movie, []).append(person)
+        self.version += 1
+        return True
+
+
+class CountingGraph():
+    """
+    Wraps a search adapter, counting into a SearchStats every person
+    whose movies are listed and every cast that is read.
+    """
+
+    def __init__(self, graph, stats):
+        self.graph = graph
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.graph, name)
+
+    def movies_of(self, person):
+        self.stats.nodes_expanded += 1
+        return self.graph.movies_of(person)
+
+    def stars_of(self, movie):
+        stars = self.graph.stars_of(movie)
+        self.stats.movies_scanned += 1
+        self.stats.edges_scanned += len(stars)
+        return stars
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` dictionary over a compact graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.key(person_id)
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` dictionary over a compact graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_key(movie_id)
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person] for person in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` dictionary over a compact graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._len = None
+        self._version = None
+
+    def __getitem__(self, name):
+        graph = self.graph
+        matches = graph.keys_for_name(name)
+        if not matches:
+            raise KeyError(name)
+        return {graph.person_ids[person] for person in matches}
+
+    def __iter__(self):
+        names = self.graph.person_names
+        built = (names[person].lower() for person in self.graph.name_order)
+        last = None
+        for name in heapq.merge(built, sorted(self.graph.added_names)):
+            if name != last:
+                yield name
+                last = name
+
+    def __len__(self):
+        if self._len is None or self._version != self.graph.version:
+            self._len = sum(1 for _ in self)
+            self._version = self.graph.version
+        return self._len
+
+
+class Appended():
+    """
+    A read-only sequence followed by a list of items added after it.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.added = []
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def __getitem__(self, i):
+        if i < len(self.base):
+            return self.base[i]
+        return self.added[i - len(self.base)]
+
+    def __iter__(self):
+        yield from self.base
+        yield from self.added
+
+    def append(self, item):
+        self.added.append(item)
+
+
+def person_positions(people):
+    """
+    Map a graph's people, listed in file order, to their positions, or
+    return None when every person already is their own position, as in
+    a compact graph.
+    """
+    if all(person == i for i, person in enumerate(people)):
+        return None
+    return {person: i for i, person in enumerate(people)}
+
+
+def _appendable(graph, attribute):
+    """
+    Wrap a sequence attribute of `graph` so that it can be appended to.
+    """
+    sequence = getattr(graph, attribute)
+    if not isinstance(sequence, Appended):
+        sequence = Appended(sequence)
+        setattr(graph, attribute, sequence)
+    return sequence
+
+
+def _lookup(order, ids, value):
+    """
+    Binary search `order`, a list of indexes sorted by `ids`, for `value`.
+    """
+    i = bisect_left(order, value, key=ids.__getitem__)
+    if i == len(order) or ids[order[i]] != value:
+        raise KeyError(value)
+    return order[i]
+
+
+def _order(values):
+    """
+    Return the indexes of `values` in sorted order as an int32 array.
+    """
+    return array("i", sorted(range(len(values)), key=values.__getitem__))
+
+
+def _csr(n, sources, targets):
+    """
+    Group (source, target) edges by source into CSR offsets and
+    targets, dropping duplicate edges.
+    """
+    counts = array("i", bytes(4 * (n + 1)))
+    for source in sources:
+        counts[source + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+
+    cursor = array("i", counts)
+    grouped = array("i", bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        grouped[cursor[source]] = target
+        cursor[source] += 1
+
+    # Sort and deduplicate each row in place, shifting rows down as they shrink
+    offsets = array("i", bytes(4 * (n + 1)))
+    end = 0
+    for i in range(n):
+        row = sorted(set(grouped[counts[i]:counts[i + 1]]))
+        grouped[end:end + len(row)] = array("i", row)
+        end += len(row)
+        offsets[i + 1] = end
+    del grouped[end:]
+    return offsets, grouped
+
+
+def _transpose(n, offsets, targets):
+    """
+    Build the reverse CSR table of a deduplicated CSR table,
+    with `n` rows on the target side.
+    """
+    counts = array("i", bytes(4 * (n + 1)))
+    for target in targets:
+        counts[target + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+
+    cursor = array("i", counts)
+    sources = array("i", bytes(4 * len(targets)))
+    for source in range(len(offsets) - 1):
+        for i in range(offsets[source], offsets[source + 1]):
+            target = targets[i]
+            sources[cursor[target]] = source
+            cursor[target] += 1
+    return counts, sources
@@ -0,0 +1,232 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graph import person_positions
+from snapshot import replace_file, source_key
+
+# Bump whenever the file layout or meaning changes
+LANDMARKS_VERSION = 1
+
+LANDMARKS_NAME = "degrees.landmarks"
+MAGIC = b"DEGLAND\0"
+PREAMBLE = struct.Struct("<8sII")
+
+# Distances are stored one byte per person; longer ones are clamped to
+# CLAMP, which can only ever loosen the lower bounds
+UNREACHED = 255
+CLAMP = 254
+
+STRATEGIES = ("degree", "coverage")
+
+
+class LandmarkOracle():
+    """
+    Degrees of separation from a few landmark people to everybody else.
+
+    `distances[i][p]` is the distance from landmark `i` to the person at
+    position `p` in file order, or UNREACHED. By the triangle inequality,
+    |d(L, a) - d(L, b)| <= d(a, b) <= d(L, a) + d(L, b) for every landmark
+    L, which gives both an A* heuristic and a quick estimate.
+    """
+
+    def __init__(self, landmarks, distances, positions=None, strategy=None, count=None):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.positions = positions
+        self.strategy = strategy
+        self.count = len(landmarks) if count is None else count
+
+    @classmethod
+    def build(cls, graph, count=16, strategy="degree"):
+        """
+        Choose `count` landmarks in `graph` and find everybody's distance
+        to them.
+
+        The "degree" strategy takes the people with the most movies. The
+        "coverage" strategy starts from the busiest person, then each time
+        takes the busiest of the people farthest from every landmark so
+        far, so that landmarks spread across the graph and its components.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown landmark strategy: {strategy!r}")
+        if count < 1:
+            raise ValueError(f"need at least one landmark, not {count}")
+        people = list(graph.persons())
+        positions = person_positions(people)
+        degree = [len(graph.movies_of(person)) for person in people]
+
+        oracle = cls([], [], positions, strategy, count)
+        if strategy == "degree":
+            ranked = sorted(range(len(people)), key=degree.__getitem__, reverse=True)
+            for position in ranked[:count]:
+                oracle.add(graph, people, position)
+            return oracle
+
+        nearest = array("B", [UNREACHED]) * len(people)
+        while len(oracle.landmarks) < count:
+            position = max(range(len(people)), key=lambda p: (nearest[p], degree[p]))
+            if nearest[position] == 0:
+                break
+            distance = oracle.add(graph, people, position)
+            for p in range(len(people)):
+                if distance[p] < nearest[p]:
+                    nearest[p] = distance[p]
+        return oracle
+
+    def add(self, graph, people, position):
+        """
+        Make the person at `position` of `people` a landmark.
+        """
+        distance = _distances(graph, people, self.positions, position)
+        self.landmarks.append(position)
+        self.distances.append(distance)
+        return distance
+
+    def position(self, person):
+        if self.positions is None:
+            return person
+        return self.positions[person]
+
+    def profile(self, person):
+        """
+        Return the distance from every landmark to `person`.
+        """
+        position = self.position(person)
+        return tuple(distance[position] for distance in self.distances)
+
+    def lower_bound(self, person, target_profile):
+        """
+        Return a lower bound on the distance from `person` to the person
+        whose profile is `target_profile`, or None if some landmark
+        reaches one and not the other, so they cannot be connected.
+        """
+        position = self.position(person)
+        bound = 0
+        for distance, target in zip(self.distances, target_profile):
+            here = distance[position]
+            if here == UNREACHED or target == UNREACHED:
+                if here != target:
+                    return None
+                continue
+            gap = here - target if here > target else target - here
+            if gap > bound:
+                bound = gap
+        return bound
+
+    def estimate(self, source, target):
+        """
+        Return (lower, upper) bounds on the distance between two people,
+        or None if they cannot be connected. `upper` is None when no
+        landmark reaches both of them.
+        """
+        target_profile = self.profile(target)
+        lower = self.lower_bound(source, target_profile)
+        if lower is None:
+            return None
+        upper = None
+        for here, there in zip(self.profile(source), target_profile):
+            if here != UNREACHED and there != UNREACHED:
+                if upper is None or here + there < upper:
+                    upper = here + there
+        return lower, upper
+
+    def save(self, directory):
+        """
+        Write the oracle next to the CSV files in `directory`.
+        Failing to write it is not an error.
+        """
+        header = json.dumps({
+            "key": source_key(directory),
+            "strategy": self.strategy,
+            "count": self.count,
+            "landmarks": self.landmarks,
+            "people": len(self.distances[0]) if self.distances else 0
+        }).encode()
+
+        def write(f):
+            f.write(PREAMBLE.pack(MAGIC, LANDMARKS_VERSION, len(header)))
+            f.write(header)
+            for distance in self.distances:
+                f.write(distance)
+
+        replace_file(os.path.join(directory, LANDMARKS_NAME), write)
+
+    @classmethod
+    def load(cls, directory, graph, count, strategy):
+        """
+        Memory-map the saved oracle for `directory`, or return None if
+        there is none that is current, whole, and built with `count`
+        landmarks chosen by `strategy`.
+        """
+        path = os.path.join(directory, LANDMARKS_NAME)
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, header_size = PREAMBLE.unpack_from(buffer)
+            if magic != MAGIC or version != LANDMARKS_VERSION:
+                return None
+            header = json.loads(buffer[PREAMBLE.size:PREAMBLE.size + header_size])
+            if (header["key"] != source_key(directory) or header["strategy"] != strategy
+                    or header["count"] != count):
+                return None
+            landmarks, expected = list(header["landmarks"]), int(header["people"])
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            return None
+
+        people = list(graph.persons())
+        if len(people) != expected:
+            return None
+        start = PREAMBLE.size + header_size
+        if len(buffer) < start + len(landmarks) * len(people):
+            return None
+        positions = person_positions(people)
+        view = memoryview(buffer)
+        distances = [
+            view[start + i * len(people):start + (i + 1) * len(people)]
+            for i in range(len(landmarks))
+        ]
+        return cls(landmarks, distances, positions, strategy, count)
+
+
+def load_or_build(directory, graph, count=16, strategy="degree"):
+    """
+    Return the landmark oracle for `directory`, from its saved file if
+    it is current, else by building and saving a new one.
+    """
+    oracle = LandmarkOracle.load(directory, graph, count, strategy)
+    if oracle is None:
+        oracle = LandmarkOracle.build(graph, count, strategy)
+        oracle.save(directory)
+    return oracle
+
+
+def _distances(graph, people, positions, start):
+    """
+    Breadth-first search from the person at position `start`, returning
+    every person's clamped distance from them in a byte array.
+    """
+    distance = array("B", [UNREACHED]) * len(people)
+    distance[start] = 0
+    seen = {people[start]}
+    scanned = set()
+    layer = [people[start]]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if movie in scanned:
+                    continue
+                scanned.add(movie)
+                for star in graph.stars_of(movie):
+                    if star not in seen:
+                        seen.add(star)
+                        next_layer.append(star)
+                        position = star if positions is None else positions[star]
+                        distance[position] = min(depth, CLAMP)
+        layer = next_layer
+    return distance
@@ -0,0 +1,147 @@
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup over a list of names.
+
+    Names are normalized (case-folded, accents and extra spaces removed)
+    and kept sorted, so a prefix is a binary search. Each name is also
+    listed under every trigram of its padded normal form. One edit can
+    break at most four of a query's trigrams (a swap of adjacent letters
+    touches four, anything else three), so a name within `k` edits
+    shares all but 4k of them, which narrows a fuzzy search to a few
+    candidates before any edit distances are computed.
+
+    Names added later are numbered after the rest, so that every
+    posting list stays sorted; `order` lists the numbers by key.
+    """
+
+    def __init__(self, names):
+        entries = sorted((normalize(name), name) for name in set(names))
+        self.keys = [key for key, _ in entries]
+        self.names = [name for _, name in entries]
+        self.order = list(range(len(entries)))
+        self.postings = {}
+        for i, key in enumerate(self.keys):
+            self._post(i, key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, name):
+        """
+        Index one more name.
+        """
+        i = len(self.keys)
+        key = normalize(name)
+        self.keys.append(key)
+        self.names.append(name)
+        insort(self.order, i, key=self.keys.__getitem__)
+        self._post(i, key)
+
+    def _post(self, i, key):
+        for gram in set(trigrams(key)):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("i")
+            posting.append(i)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Return up to `limit` names starting with `prefix`, in order.
+        """
+        key = normalize(prefix)
+        start = bisect_left(self.order, key, key=self.keys.__getitem__)
+        matches = []
+        for i in self.order[start:start + limit]:
+            if not self.keys[i].startswith(key):
+                break
+            matches.append(self.names[i])
+        return matches
+
+    def fuzzy(self, query, max_edits=2, limit=10):
+        """
+        Return up to `limit` (name, edits) pairs for the names within
+        `max_edits` insertions, deletions, substitutions or swaps of
+        adjacent letters of `query`, closest first.
+        """
+        key = normalize(query)
+        grams = set(trigrams(key))
+        needed = len(grams) - 4 * max_edits
+        postings = sorted((self.postings.get(gram, array("i")) for gram in grams), key=len)
+
+        if needed <= 0:
+            # Too short to filter on trigrams: compare against every name
+            # of a similar length
+            candidates = (i for i, other in enumerate(self.keys)
+                          if abs(len(other) - len(key)) <= max_edits)
+        else:
+            # Any name sharing `needed` trigrams appears in at least one of
+            # the rarest len(postings) - needed + 1 lists; its count in the
+            # longer lists is then found by binary search
+            split = len(postings) - needed + 1
+            counts = {}
+            for posting in postings[:split]:
+                for i in posting:
+                    counts[i] = counts.get(i, 0) + 1
+            candidates = []
+            for i, count in counts.items():
+                remaining = len(postings) - split
+                for posting in postings[split:]:
+                    if count >= needed or count + remaining < needed:
+                        break
+                    remaining -= 1
+                    j = bisect_left(posting, i)
+                    if j < len(posting) and posting[j] == i:
+                        count += 1
+                if count >= needed:
+                    candidates.append(i)
+
+        matches = []
+        for i in candidates:
+            edits = distance(key, self.keys[i], max_edits)
+            if edits <= max_edits:
+                matches.append((edits, self.keys[i], self.names[i]))
+        matches.sort()
+        return [(name, edits) for edits, _, name in matches[:limit]]
+
+
+def normalize(name):
+    """
+    Fold case, strip accents and collapse whitespace.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def distance(a, b, limit):
+    """
+    Optimal string alignment distance between `a` and `b`, giving up
+    with `limit + 1` as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            best = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                best = min(best, previous2[j - 2] + 1)
+            current[j] = best
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[len(b)]
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import traceback
+
+import degrees
+from util import SearchStats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python server.py [directory] [--host HOST] [--port PORT | --unix PATH]",
+        description="Load the dataset once and answer JSON Lines requests over a local socket."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="search worker processes (default: one per CPU)")
+    parser.add_argument("--cache-mb", type=int, default=0,
+                        help="cache search trees per source, up to this many MiB per worker")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="N",
+                        help="load N landmarks so requests can use the astar method")
+    parser.add_argument("--dicts", action="store_true",
+                        help="hold the dataset in dictionaries instead of CSR arrays")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files instead of using the binary snapshot")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    dataset = (args.directory, not args.dicts, not args.no_snapshot, args.landmarks, args.cache_mb)
+    _load(*dataset)
+    print("Data loaded.")
+
+    server = DegreesServer(processes=args.processes, dataset=dataset)
+    try:
+        asyncio.run(server.serve(host=args.host, port=args.port, path=args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+class DegreesServer():
+    """
+    Answers requests against the already loaded dataset.
+
+    Each request is one JSON object per line, carrying an "op" and an
+    optional "id" that is echoed back:
+
+        {"op": "path", "source": ..., "target": ..., "method": "bidirectional", "trace": false}
+        {"op": "resolve", "name": ...}
+        {"op": "search", "query": ..., "limit": 10}
+        {"op": "stats"}
+        {"op": "update", "directory": ...}
+
+    Sources and targets are person ids or names; a "path" request may
+    also give a ranking "policy" for shared names and set "fuzzy" to
+    accept misspelt ones, as in degrees.resolve_person, and set "trace"
+    for the search's SearchStats in a "trace" field. Each reply
+    is one JSON object per line with "ok" set, and either the result or
+    an "error". Requests on a connection are answered as they finish,
+    not in order; searches run in a pool of worker processes so that a
+    slow one never holds up the rest.
+
+    An "update" applies the delta CSV files in a directory on the
+    server's side, as degrees.apply_delta, then replaces the pool with
+    workers that see the new data. Searches already running finish on
+    the old workers.
+
+    The name index behind fuzzy names and "search" is built up front,
+    since building it on the event loop would hold up every connection.
+    """
+
+    def __init__(self, processes=None, dataset=None):
+        if "fork" not in multiprocessing.get_all_start_methods() and dataset is None:
+            raise ValueError("workers that cannot fork need a dataset to load")
+        self.processes = processes
+        self.dataset = dataset
+        self.deltas = []
+        degrees.name_index()
+        self.pool = self.start_pool()
+
+    def start_pool(self):
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Forked workers share the loaded graph copy-on-write
+            context, initializer, initargs = multiprocessing.get_context("fork"), None, ()
+        else:
+            context, initializer = multiprocessing.get_context(), _load
+            initargs = (*self.dataset, tuple(self.deltas))
+        return concurrent.futures.ProcessPoolExecutor(
+            self.processes, mp_context=context, initializer=initializer, initargs=initargs
+        )
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Listen on `path` as a Unix socket if given, else on TCP
+        `host`:`port`, until cancelled.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=path)
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+        address = path or f"{host}:{port}"
+        print(f"Serving on {address}.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        """
+        Answer every request on one connection until it closes.
+        """
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(line):
+            reply = await self.reply(line)
+            async with lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def reply(self, line):
+        """
+        Return the reply to one request line. Every request gets one,
+        even if answering it fails unexpectedly.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return {"ok": False, "error": f"bad request: {e}"}
+
+        reply = {"id": request.get("id")} if "id" in request else {}
+        try:
+            reply.update(await self.dispatch(request))
+            reply["ok"] = True
+        except KeyError as e:
+            reply.update({"ok": False, "error": f"missing field: {e.args[0]}"})
+        except (LookupError, ValueError, RuntimeError, OSError) as e:
+            reply.update({"ok": False, "error": e.args[0] if e.args else type(e).__name__})
+        except Exception as e:
+            traceback.print_exc()
+            reply.update({"ok": False, "error": f"internal error: {type(e).__name__}: {e}"})
+        return reply
+
+    async def dispatch(self, request):
+        op = request.get("op")
+        if op == "path":
+            policy, fuzzy = request.get("policy"), bool(request.get("fuzzy"))
+            if policy is not None and policy not in degrees.RANKING_POLICIES:
+                raise ValueError(f"unknown ranking policy: {policy}")
+            source = degrees.resolve_person(str(request["source"]), policy, fuzzy)
+            target = degrees.resolve_person(str(request["target"]), policy, fuzzy)
+            method = request.get("method", "bidirectional")
+            if method not in degrees.METHODS:
+                raise ValueError(f"unknown search method: {method}")
+            trace = bool(request.get("trace"))
+            loop = asyncio.get_running_loop()
+            path, stats = await loop.run_in_executor(
+                self.pool, _search, source, target, method, trace
+            )
+            reply = {
+                "source": source,
+                "target": target,
+                "degrees": None if path is None else len(path),
+                "path": path
+            }
+            if trace:
+                reply["trace"] = stats
+            return reply
+        if op == "resolve":
+            person_ids = sorted(degrees.names.get(str(request["name"]).lower(), set()))
+            return {"people": [_person(person_id) for person_id in person_ids]}
+        if op == "search":
+            limit = request.get("limit", 10)
+            if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+                raise ValueError(f"bad request: limit must be a positive integer, not {limit!r}")
+            person_ids = degrees.find_people(str(request["query"]), limit=limit)
+            return {"people": [_person(person_id) for person_id in person_ids]}
+        if op == "stats":
+            return {"stats": degrees.load_stats()}
+        if op == "update":
+            # Applied on the event loop, so no other request sees it half done
+            directory = str(request["directory"])
+            added = degrees.apply_delta(directory)
+            self.deltas.append(directory)
+            pool, self.pool = self.pool, self.start_pool()
+            pool.shutdown(wait=False)
+            return {"added": added, "stats": degrees.load_stats()}
+        raise ValueError(f"unknown op: {op}")
+
+
+def _person(person_id):
+    person = degrees.people[person_id]
+    return {"id": person_id, "name": person["name"], "birth": person["birth"]}
+
+
+def _search(source, target, method, trace=False):
+    stats = SearchStats() if trace else None
+    path = degrees.shortest_path(source, target, method=method, stats=stats)
+    return path, None if stats is None else stats.as_dict()
+
+
+def _load(directory, compact_backend, use_snapshot, landmarks=0, cache_mb=0, deltas=()):
+    degrees.load_data(directory, compact_backend=compact_backend, use_snapshot=use_snapshot)
+    if landmarks:
+        degrees.load_landmarks(directory, count=landmarks)
+    for delta in deltas:
+        degrees.apply_delta(delta)
+    if cache_mb:
+        degrees.enable_cache(max_bytes=cache_mb * 2 ** 20)
+
+
+if __name__ == "__main__":
+    main()
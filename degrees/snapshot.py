@@ -0,0 +1,206 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from components import ComponentIndex
+from graph import CompactGraph
+
+# Bump whenever the section layout or meaning changes
+SNAPSHOT_VERSION = 2
+
+SNAPSHOT_NAME = "degrees.snapshot"
+MAGIC = b"DEGSNAP\0"
+PREAMBLE = struct.Struct("<8sII")
+ALIGN = 8
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+INT_SECTIONS = (
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars",
+    "person_order", "movie_order", "name_order"
+)
+COMPONENT_SECTIONS = ("labels", "sizes")
+STRING_SECTIONS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years"
+)
+
+
+class StringTable():
+    """
+    Sequence of strings stored as one UTF-8 blob plus int64 offsets,
+    decoding each string only when it is asked for.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self.offsets) - 1:
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def source_key(directory):
+    """
+    Return the size and modification time of each CSV file,
+    which a snapshot must match to be used.
+    """
+    key = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        key[name] = [stat.st_size, stat.st_mtime_ns]
+    return key
+
+
+def load(directory):
+    """
+    Memory-map the snapshot in `directory` as a CompactGraph and the
+    ComponentIndex of that graph.
+
+    Returns None if there is no snapshot, or it was written by another
+    version or byte order, or the CSV files have changed since, or it
+    is truncated or otherwise unreadable.
+    """
+    path = os.path.join(directory, SNAPSHOT_NAME)
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, version, header_size = PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        header = json.loads(buffer[PREAMBLE.size:PREAMBLE.size + header_size])
+        if header["byteorder"] != sys.byteorder or header["key"] != source_key(directory):
+            return None
+    except (struct.error, ValueError, KeyError, OSError):
+        return None
+
+    try:
+        view = memoryview(buffer)
+        sections = {}
+        for name, (offset, size, typecode) in header["sections"].items():
+            if offset < 0 or size < 0 or offset + size > len(buffer):
+                return None
+            sections[name] = view[offset:offset + size].cast(typecode)
+        for name in STRING_SECTIONS:
+            sections[name] = StringTable(sections.pop(f"{name}.blob"),
+                                         sections.pop(f"{name}.offsets"))
+        components = ComponentIndex(
+            *(sections.pop(f"components.{name}") for name in COMPONENT_SECTIONS)
+        )
+        return CompactGraph(**sections), components
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def save(directory, graph, components):
+    """
+    Write `graph` and its `components` as the snapshot for the CSV
+    files in `directory`.
+
+    The snapshot is only a cache, so failing to write it is not an error.
+    """
+    sections = []
+    for name in INT_SECTIONS:
+        sections.append((name, "i", _int32(getattr(graph, name))))
+    for name in COMPONENT_SECTIONS:
+        sections.append((f"components.{name}", "i", _int32(getattr(components, name))))
+    for name in STRING_SECTIONS:
+        blob, offsets = _encode(getattr(graph, name))
+        sections.append((f"{name}.blob", "B", blob))
+        sections.append((f"{name}.offsets", "q", offsets.tobytes()))
+
+    # Lay the sections out after the header, each aligned for its typecode
+    header = {"byteorder": sys.byteorder, "key": source_key(directory), "sections": {}}
+    header_bytes = b""
+    while True:
+        offset = _aligned(PREAMBLE.size + len(header_bytes))
+        for name, typecode, data in sections:
+            header["sections"][name] = [offset, len(data), typecode]
+            offset = _aligned(offset + len(data))
+        encoded = json.dumps(header).encode()
+        if len(encoded) <= len(header_bytes):
+            header_bytes = encoded.ljust(len(header_bytes))
+            break
+
+        # Leave slack so the offsets rarely change the header's own length
+        header_bytes = encoded + b" " * 64
+
+    def write(f):
+        f.write(PREAMBLE.pack(MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, typecode, data in sections:
+            f.seek(header["sections"][name][0])
+            f.write(data)
+
+    replace_file(os.path.join(directory, SNAPSHOT_NAME), write)
+
+
+def replace_file(path, write):
+    """
+    Write a cache file at `path` by calling `write` with a temporary
+    file opened for binary writing, then moving it into place, so that
+    readers never see it half written. Failing to write it is not an
+    error, and leaves nothing behind.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            write(f)
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def load_or_build(directory):
+    """
+    Return the CompactGraph for `directory` and its ComponentIndex, from
+    its snapshot if it is current, else by parsing the CSV files and
+    writing a new snapshot.
+    """
+    loaded = load(directory)
+    if loaded is None:
+        graph = CompactGraph.from_csv(directory)
+        components = ComponentIndex.build(graph)
+        save(directory, graph, components)
+        loaded = graph, components
+    return loaded
+
+
+def _int32(values):
+    if isinstance(values, memoryview):
+        return values.tobytes()
+    return array("i", values).tobytes()
+
+
+def _encode(strings):
+    offsets = array("q", [0])
+    chunks = []
+    total = 0
+    for string in strings:
+        chunk = string.encode("utf-8")
+        chunks.append(chunk)
+        total += len(chunk)
+        offsets.append(total)
+    return b"".join(chunks), offsets
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
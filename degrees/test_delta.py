@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import degrees
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+class CompactDeltaTest(unittest.TestCase):
+    """
+    Deltas applied to the compact backend must give the same answers as
+    loading the merged CSV files afresh.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.base = os.path.join(self.directory, "base")
+        self.delta = os.path.join(self.directory, "delta")
+        shutil.copytree(SMALL, self.base, ignore=shutil.ignore_patterns("degrees.*"))
+        os.mkdir(self.delta)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        degrees.tree_cache = None
+
+    def write(self, filename, header, *rows):
+        with open(os.path.join(self.delta, filename), "w", encoding="utf-8") as f:
+            f.write("\n".join([header, *rows]) + "\n")
+
+    def load(self, landmarks=False):
+        degrees.load_data(self.base, compact_backend=True)
+        degrees.enable_cache()
+        if landmarks:
+            degrees.load_landmarks(self.base, count=2)
+
+    def test_new_movie(self):
+        self.write("movies.csv", "id,title,year", '900001,"Delta Movie",2020')
+        self.write("stars.csv", "person_id,movie_id", "102,900001", "1597,900001")
+        self.load(landmarks=True)
+        added = degrees.apply_delta(self.delta)
+
+        self.assertEqual(added, {"people": 0, "movies": 1, "stars": 2})
+        self.assertEqual(degrees.movies["900001"]["stars"], {"102", "1597"})
+        for method in ("bfs", "bidirectional", "astar"):
+            degrees.tree_cache = None
+            path = degrees.shortest_path("102", "1597", method=method)
+            self.assertEqual(path, [("900001", "1597")])
+
+    def test_new_people_only(self):
+        self.write("people.csv", "id,name,birth", '900002,"Delta Person",1990')
+        self.load(landmarks=True)
+        added = degrees.apply_delta(self.delta)
+
+        self.assertEqual(added, {"people": 1, "movies": 0, "stars": 0})
+        self.assertEqual(degrees.people["900002"]["movies"], set())
+        self.assertEqual(degrees.resolve_person("Delta Person"), "900002")
+        self.assertEqual(degrees.find_people("delta person"), ["900002"])
+        self.assertEqual(degrees.rank_people(["900002"]), ["900002"])
+        self.assertIsNone(degrees.shortest_path("102", "900002"))
+
+    def test_landmarks_after_delta(self):
+        self.write("stars.csv", "person_id,movie_id", "163,112384")
+        self.load()
+        degrees.apply_delta(self.delta)
+        degrees.load_landmarks(self.base, count=2)
+        self.assertEqual(degrees.estimated_degrees("102", "163")[0], 1)
+
+        # Reloading the files must not see distances from the delta
+        self.load(landmarks=True)
+        path = degrees.shortest_path("102", "163")
+        lower, upper = degrees.estimated_degrees("102", "163")
+        self.assertEqual(len(path), 2)
+        self.assertLessEqual(lower, len(path))
+        self.assertTrue(upper is None or upper >= len(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,7 @@
+import time
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +40,103 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self._forget(node.state)
+            return node
+
+    def _forget(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self._forget(node.state)
+            return node
+
+
+class SearchStats():
+    """
+    What one search did: how many people it expanded, how many movie
+    casts and (movie, star) edges it read, the most people waiting in
+    its frontier, how many people it explored, and how long each
+    breadth-first layer and the whole search took.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.degrees = None
+        self.nodes_expanded = 0
+        self.movies_scanned = 0
+        self.edges_scanned = 0
+        self.peak_frontier = 0
+        self.explored = 0
+        self.layer_seconds = []
+        self.seconds = 0.0
+        self._started = None
+        self._layer_started = None
+
+    def start(self, method):
+        self.method = method
+        self._started = self._layer_started = time.perf_counter()
+
+    def layer(self, frontier, explored):
+        """
+        Record the end of a layer, leaving `frontier` people to expand
+        and `explored` explored.
+        """
+        now = time.perf_counter()
+        self.layer_seconds.append(now - self._layer_started)
+        self._layer_started = now
+        self.frontier(frontier)
+        self.explored = explored
+
+    def frontier(self, size):
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def finish(self, path):
+        self.seconds = time.perf_counter() - self._started
+        self.degrees = None if path is None else len(path)
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "degrees": self.degrees,
+            "nodes_expanded": self.nodes_expanded,
+            "movies_scanned": self.movies_scanned,
+            "edges_scanned": self.edges_scanned,
+            "peak_frontier": self.peak_frontier,
+            "explored": self.explored,
+            "layer_seconds": self.layer_seconds,
+            "seconds": self.seconds
+        }
@@ -0,0 +1,161 @@
+from graph import LinkGraph
+
+SOLVERS = ("jacobi", "gauss-seidel", "extrapolated")
+NORMS = ("l1", "linf")
+
+TOLERANCE = 0.001
+MAX_ITERATIONS = 10000
+
+# Extrapolate after this many plain steps, once the error is dominated
+# by the slowest decaying eigenvectors
+EXTRAPOLATION_PERIOD = 10
+
+
+class Solution():
+    """
+    PageRank values found by `solve`, with the number of sweeps over
+    the corpus it took and the residual it stopped at.
+    """
+
+    def __init__(self, ranks, solver, iterations, residual):
+        self.ranks = ranks
+        self.solver = solver
+        self.iterations = iterations
+        self.residual = residual
+
+
+def solve(corpus, damping_factor, solver="gauss-seidel", tolerance=TOLERANCE, norm="linf",
+          max_iterations=MAX_ITERATIONS):
+    """
+    Return the Solution for PageRank over `corpus` found by one of the
+    SOLVERS, iterating until the residual is at most `tolerance`.
+
+    The residual measures, over the whole rank vector, how far the last
+    sweep moved it: by the largest change to any page for the "linf"
+    norm, or the sum of all the changes for "l1". "jacobi" computes
+    every page from the previous sweep's values; "gauss-seidel" uses
+    each value as soon as it is updated, and rescales the ranks to sum
+    to 1 after each sweep, which usually needs far fewer sweeps;
+    "extrapolated" is Jacobi iteration with quadratic extrapolation
+    every few sweeps, which cancels the slowest decaying parts of the
+    error at once.
+
+    Dangling pages are taken to link to every page, as in
+    `transition_model`. Raises RuntimeError if `max_iterations` sweeps
+    do not reach the tolerance.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver: {solver!r}")
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm: {norm!r}")
+    system = _System(LinkGraph(corpus), damping_factor)
+    ranks = [1 / len(system.pages)] * len(system.pages)
+    history = []
+
+    for iteration in range(1, max_iterations + 1):
+        if solver == "gauss-seidel":
+            old = list(ranks)
+            system.sweep(ranks)
+            total = sum(ranks)
+            ranks = [rank / total for rank in ranks]
+        else:
+            old, ranks = ranks, system.step(ranks)
+        residual = _norm(ranks, old, norm)
+        if residual <= tolerance:
+            return Solution(system.ranks(ranks), solver, iteration, residual)
+
+        if solver == "extrapolated":
+            history = [*history[-3:], ranks]
+            if iteration % EXTRAPOLATION_PERIOD == 0 and len(history) == 4:
+                ranks = _quadratic(*history)
+                history = []
+
+    raise RuntimeError(f"{solver} did not converge in {max_iterations} iterations")
+
+
+class _System():
+    """
+    The PageRank equations over pages numbered in corpus order.
+    """
+
+    def __init__(self, links, damping_factor):
+        self.pages = links.pages
+        self.inbound, self.weight, self.dangling = links.numbered()
+        self.is_dangling = [links.out_degree[page] == 0 for page in self.pages]
+        self.damping_factor = damping_factor
+
+    def share(self, mass):
+        """
+        Return what every page gets from random jumps and from the
+        dangling pages, which hold `mass` of the rank between them.
+        """
+        return ((1 - self.damping_factor) + self.damping_factor * mass) / len(self.pages)
+
+    def step(self, ranks):
+        """
+        Return the ranks after one Jacobi step from `ranks`.
+        """
+        d = self.damping_factor
+        weighted = [rank * weight for rank, weight in zip(ranks, self.weight)]
+        share = self.share(sum(ranks[page] for page in self.dangling))
+        return [
+            share + d * sum(weighted[parent] for parent in parents)
+            for parents in self.inbound
+        ]
+
+    def sweep(self, ranks):
+        """
+        Update `ranks` in place by one Gauss-Seidel sweep.
+        """
+        d = self.damping_factor
+        weight = self.weight
+        mass = sum(ranks[page] for page in self.dangling)
+        for page, parents in enumerate(self.inbound):
+            value = self.share(mass) + d * sum(ranks[parent] * weight[parent] for parent in parents)
+            if self.is_dangling[page]:
+                mass += value - ranks[page]
+            ranks[page] = value
+
+    def ranks(self, ranks):
+        return dict(zip(self.pages, ranks))
+
+
+def _norm(new, old, norm):
+    if norm == "l1":
+        return sum(abs(a - b) for a, b in zip(new, old))
+    return max(abs(a - b) for a, b in zip(new, old))
+
+
+def _quadratic(x0, x1, x2, x3):
+    """
+    Extrapolate the ranks from four successive iterates, assuming the
+    error lies in the span of the two slowest decaying eigenvectors
+    (Kamvar et al., "Extrapolation Methods for Accelerating PageRank
+    Computations"), and renormalize. Falls back to the last iterate if
+    the least-squares fit is degenerate.
+    """
+    y1 = [b - a for a, b in zip(x0, x1)]
+    y2 = [c - a for a, c in zip(x0, x2)]
+    y3 = [d - a for a, d in zip(x0, x3)]
+
+    # Least-squares solution of [y1 y2] (g1, g2) = -y3
+    a11 = _dot(y1, y1)
+    a12 = _dot(y1, y2)
+    a22 = _dot(y2, y2)
+    b1, b2 = -_dot(y1, y3), -_dot(y2, y3)
+    determinant = a11 * a22 - a12 * a12
+    if determinant <= 1e-12 * a11 * a22:
+        return x3
+    g1 = (b1 * a22 - b2 * a12) / determinant
+    g2 = (a11 * b2 - a12 * b1) / determinant
+
+    extrapolated = [
+        (g1 + g2 + 1) * b + (g2 + 1) * c + d
+        for b, c, d in zip(x1, x2, x3)
+    ]
+    total = sum(extrapolated)
+    return [value / total for value in extrapolated]
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
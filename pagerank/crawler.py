@@ -0,0 +1,133 @@
+import json
+import multiprocessing
+import os
+import re
+
+# Bump whenever the cache layout or meaning changes
+CACHE_VERSION = 1
+
+CACHE_NAME = "pagerank.cache"
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# The start of a link that the end of the text may have cut short
+PARTIAL = re.compile(r"<(?:a(?:\s[^>]*?(?:href=\"[^\"]*)?)?)?\Z")
+
+# Characters read from a page at a time
+CHUNK = 2 ** 20
+
+# Below this many pages to parse, a worker pool costs more than it saves
+POOL_THRESHOLD = 64
+
+
+def crawl(directory, processes=None, use_cache=True):
+    """
+    Parse a directory of HTML pages for links to other pages in it, as
+    `pagerank.crawl` does, and return the same dictionary.
+
+    Pages are parsed across a pool of `processes` workers, reading each
+    in chunks rather than whole. Unless `use_cache` is false, the links
+    found on each page are saved next to the pages, keyed by each file's
+    size and modification time, and only pages that changed since are
+    parsed again.
+    """
+    filenames = [filename for filename in os.listdir(directory) if filename.endswith(".html")]
+    cache = load_cache(directory) if use_cache else {}
+
+    stats = {}
+    stale = []
+    for filename in filenames:
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = [stat.st_size, stat.st_mtime_ns]
+        entry = cache.get(filename)
+        if entry is None or entry["key"] != stats[filename]:
+            stale.append(filename)
+
+    paths = [os.path.join(directory, filename) for filename in stale]
+    for filename, links in zip(stale, _map(paths, processes)):
+        cache[filename] = {"key": stats[filename], "links": sorted(links - {filename})}
+
+    # Forget deleted pages, and save if anything changed
+    if use_cache and (stale or len(cache) != len(filenames)):
+        cache = {filename: cache[filename] for filename in filenames}
+        save_cache(directory, cache)
+
+    # Only include links to other pages in the corpus
+    pages = dict()
+    for filename in filenames:
+        pages[filename] = set(link for link in cache[filename]["links"] if link in stats)
+    return pages
+
+
+def parse(path):
+    """
+    Return the set of link targets in the HTML file at `path`.
+
+    The file is read a chunk at a time. Whatever follows the first `<a`
+    after the last link found that could still begin a link, were the
+    chunk longer, is carried over to the next chunk, so a link split
+    between chunks is still found whole.
+    """
+    links = set()
+    carry = ""
+    with open(path) as f:
+        while chunk := f.read(CHUNK):
+            text = carry + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            partial = PARTIAL.search(text, end)
+            carry = text[partial.start():] if partial else ""
+    for match in LINK.finditer(carry):
+        links.add(match.group(1))
+    return links
+
+
+def load_cache(directory):
+    """
+    Return the links cached for `directory` by filename, or an empty
+    dictionary if there are none that can be read.
+    """
+    try:
+        with open(os.path.join(directory, CACHE_NAME), encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["version"] != CACHE_VERSION:
+            return {}
+        pages = cache["pages"]
+        if not isinstance(pages, dict) or not all(
+            isinstance(entry, dict)
+            and isinstance(entry.get("key"), list)
+            and isinstance(entry.get("links"), list)
+            and all(isinstance(link, str) for link in entry["links"])
+            for entry in pages.values()
+        ):
+            return {}
+        return pages
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def save_cache(directory, pages):
+    """
+    Write the cached links for `directory`. Failing to write them is
+    not an error.
+    """
+    path = os.path.join(directory, CACHE_NAME)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "pages": pages}, f, separators=(",", ":"))
+        os.replace(temporary, path)
+    except OSError:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def _map(paths, processes):
+    if processes == 1 or len(paths) < POOL_THRESHOLD:
+        return map(parse, paths)
+    workers = processes or os.cpu_count() or 1
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(parse, paths, chunksize=max(1, len(paths) // (4 * workers)))
@@ -0,0 +1,252 @@
+import argparse
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+import crawler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Bump whenever the file layout or meaning changes
+EDGES_VERSION = 1
+
+MAGIC = b"PREDGES\0"
+PREAMBLE = struct.Struct("<8sIQQQ")
+
+DAMPING = 0.85
+TOLERANCE = 0.001
+
+# Links held in memory at once, while sorting and while iterating
+BLOCK = 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python external.py corpus [--edges FILE] [--block N]",
+        description="Rank a corpus by PageRank with its links kept on disk."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--edges", default=None,
+                        help="edge file to write and iterate over (default: a temporary file)")
+    parser.add_argument("--block", type=int, default=BLOCK, help="links to hold in memory at once")
+    args = parser.parse_args()
+
+    path = args.edges
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".edges")
+        os.close(handle)
+    try:
+        write_corpus(args.corpus, path, block=args.block)
+        ranks = iterate_pagerank(EdgeFile(path), DAMPING, block=args.block)
+    finally:
+        if args.edges is None:
+            os.remove(path)
+    print("PageRank Results from Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class EdgeFile():
+    """
+    A memory-mapped file of the links between pages, sorted by target.
+
+    After the preamble come the page names, one per line, then each
+    page's number of links as int32, then every link as an int32
+    (target, source) pair of page numbers, in order of target and then
+    source. Sections start at multiples of 8 bytes.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, pages, edges, names_size = PREAMBLE.unpack_from(self.buffer)
+        if magic != MAGIC or version != EDGES_VERSION:
+            raise ValueError(f"not a version {EDGES_VERSION} edge file: {path}")
+        start = PREAMBLE.size
+        names = self.buffer[start:start + names_size].decode("utf-8")
+        self.pages = names.split("\n") if pages else []
+
+        start = _align(start + names_size)
+        view = memoryview(self.buffer)
+        self.out_degree = view[start:start + 4 * pages].cast("i")
+        self.edges_offset = _align(start + 4 * pages)
+        self.edges = edges
+
+    def __len__(self):
+        return len(self.pages)
+
+    def blocks(self, block=BLOCK):
+        """
+        Yield the links a block at a time, as flat memoryviews of
+        alternating targets and sources.
+        """
+        view = memoryview(self.buffer)
+        for first in range(0, self.edges, block):
+            last = min(first + block, self.edges)
+            yield view[self.edges_offset + 8 * first:self.edges_offset + 8 * last].cast("i")
+
+
+def write_corpus(directory, path, block=BLOCK):
+    """
+    Parse the HTML pages in `directory` one at a time and write their
+    links to the edge file at `path`, so that the corpus is never held
+    in memory as a whole.
+    """
+    pages = [filename for filename in os.listdir(directory) if filename.endswith(".html")]
+    names = set(pages)
+    links = (
+        (page, [link for link in crawler.parse(os.path.join(directory, page)) - {page}
+                if link in names])
+        for page in pages
+    )
+    write_edges(pages, links, path, block=block)
+
+
+def write_edges(pages, links, path, block=BLOCK):
+    """
+    Write the edge file at `path` for the named `pages`, given their
+    links as (page, targets) pairs in any order.
+
+    The links are sorted in runs of `block` written to temporary files,
+    which are then merged into place, reading back a share of a block
+    from each run at a time, so about one block is ever in memory.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    out_degree = array("i", bytes(4 * len(pages)))
+    runs = []
+    run = array("q")
+    edges = 0
+    try:
+        for page, targets in links:
+            source = index[page]
+            out_degree[source] = len(targets)
+            for target in targets:
+                run.append(index[target] << 32 | source)
+                if len(run) == block:
+                    runs.append(_write_run(run))
+                    edges += len(run)
+                    run = array("q")
+        if run:
+            runs.append(_write_run(run))
+            edges += len(run)
+
+        names = "\n".join(pages).encode("utf-8")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, EDGES_VERSION, len(pages), edges, len(names)))
+            f.write(names)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            f.write(out_degree)
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            pairs = array("i")
+            share = max(1024, block // max(len(runs), 1))
+            for key in heapq.merge(*(_read_run(run, share) for run in runs)):
+                pairs.append(key >> 32)
+                pairs.append(key & 0xFFFFFFFF)
+                if len(pairs) >= 2 * block:
+                    f.write(pairs)
+                    pairs = array("i")
+            f.write(pairs)
+        os.replace(temporary, path)
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def iterate_pagerank(edge_file, damping_factor, tolerance=TOLERANCE, block=BLOCK):
+    """
+    Return PageRank values for each page of an EdgeFile by power
+    iteration, until no page's rank changes by more than `tolerance`
+    in a step.
+
+    Each step streams the links from the file a block at a time, so
+    only the rank vectors, and one block of links, are ever in memory.
+    Blocks are processed with NumPy where it is installed. Dangling
+    pages are taken to link to every page, as in `transition_model`.
+    """
+    if np is not None:
+        return _iterate_numpy(edge_file, damping_factor, tolerance, block)
+
+    N = len(edge_file)
+    weight = array("d", (1 / max(degree, 1) for degree in edge_file.out_degree))
+    dangling = array("i", (page for page, degree in enumerate(edge_file.out_degree)
+                           if degree == 0))
+    ranks = array("d", [1 / N]) * N
+    while True:
+        share = ((1 - damping_factor) + damping_factor * sum(ranks[p] for p in dangling)) / N
+        weighted = array("d", (rank * w for rank, w in zip(ranks, weight)))
+        linked = _accumulate(edge_file, weighted, block)
+        new_ranks = array("d", (share + damping_factor * value for value in linked))
+        change = max(abs(new - old) for new, old in zip(new_ranks, ranks))
+        ranks = new_ranks
+        if change <= tolerance:
+            return dict(zip(edge_file.pages, ranks))
+
+
+def _iterate_numpy(edge_file, damping_factor, tolerance, block):
+    """
+    Return PageRank values for each page of an EdgeFile, as
+    iterate_pagerank does, keeping the rank vectors as NumPy arrays.
+    """
+    N = len(edge_file)
+    out_degree = np.frombuffer(edge_file.out_degree, dtype=np.int32)
+    weight = 1 / np.maximum(out_degree, 1)
+    dangling = np.flatnonzero(out_degree == 0)
+    ranks = np.full(N, 1 / N)
+    while True:
+        weighted = ranks * weight
+        linked = np.zeros(N)
+        for pairs in edge_file.blocks(block):
+            pairs = np.frombuffer(pairs, dtype=np.int32)
+            targets = pairs[0::2]
+
+            # Links are sorted by target, so a block only reaches the
+            # pages from its first target to its last
+            first, last = int(targets[0]), int(targets[-1]) + 1
+            linked[first:last] += np.bincount(targets - first, weights=weighted[pairs[1::2]],
+                                              minlength=last - first)
+        share = ((1 - damping_factor) + damping_factor * ranks[dangling].sum()) / N
+        new_ranks = share + damping_factor * linked
+        change = np.abs(new_ranks - ranks).max()
+        ranks = new_ranks
+        if change <= tolerance:
+            return dict(zip(edge_file.pages, ranks.tolist()))
+
+
+def _accumulate(edge_file, weighted, block):
+    """
+    Return, for each page, the sum of `weighted` over its linking pages.
+    """
+    linked = array("d", bytes(8 * len(edge_file)))
+    for pairs in edge_file.blocks(block):
+        for i in range(0, len(pairs), 2):
+            linked[pairs[i]] += weighted[pairs[i + 1]]
+    return linked
+
+
+def _write_run(run):
+    run = array("q", sorted(run))
+    handle, path = tempfile.mkstemp(suffix=".run")
+    with os.fdopen(handle, "wb") as f:
+        f.write(run)
+    return path
+
+
+def _read_run(path, block):
+    with open(path, "rb") as f:
+        while chunk := f.read(8 * block):
+            yield from array("q", chunk)
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+class LinkGraph():
+    """
+    Link structure of a corpus, indexed once for iteration.
+
+    `inbound[page]` lists the pages that link to `page`, and
+    `out_degree[page]` counts the links on `page`, so one sweep over
+    every page's parents costs time in proportion to the links.
+    """
+
+    def __init__(self, corpus):
+        self.pages = list(corpus)
+        self.inbound = {page: [] for page in self.pages}
+        self.out_degree = {}
+        for page, links in corpus.items():
+            self.out_degree[page] = len(links)
+            for link in links:
+                self.inbound[link].append(page)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def dangling(self):
+        """
+        Return the pages without any links.
+        """
+        return [page for page in self.pages if self.out_degree[page] == 0]
+
+    def numbered(self):
+        """
+        Return the link structure with pages numbered in corpus order, as
+        three lists: the numbers of the pages linking to each page, the
+        share of its rank that each page passes down every link, and the
+        numbers of the pages without any links. A page without links
+        passes none down its links, but keeps a share of 1 so that
+        multiplying by it changes nothing.
+        """
+        index = {page: i for i, page in enumerate(self.pages)}
+        inbound = [[index[parent] for parent in self.inbound[page]] for page in self.pages]
+        weight = [1 / max(self.out_degree[page], 1) for page in self.pages]
+        dangling = [index[page] for page in self.dangling()]
+        return inbound, weight, dangling
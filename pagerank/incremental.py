@@ -0,0 +1,119 @@
+from collections import Counter, deque
+
+from graph import LinkGraph
+
+# Pages stop passing on changes smaller than this fraction of the average rank
+TOLERANCE = 1e-4
+
+
+def diff_corpora(old, new):
+    """
+    Return the changes that turn one `crawl` dictionary into another,
+    as a dictionary of the sets "added_pages", "removed_pages",
+    "added_links" and "removed_links", with links as (page, target)
+    pairs.
+    """
+    return {
+        "added_pages": set(new) - set(old),
+        "removed_pages": set(old) - set(new),
+        "added_links": {
+            (page, link) for page in new for link in new[page]
+            if page not in old or link not in old[page]
+        },
+        "removed_links": {
+            (page, link) for page in old for link in old[page]
+            if page not in new or link not in new[page]
+        }
+    }
+
+
+def update_pagerank(corpus, damping_factor, ranks, diff, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page of `corpus`, starting from the
+    values `ranks` had before the changes in `diff` (as returned by
+    diff_corpora), and the number of single-page updates that took;
+    a full sweep of the corpus would be one per page.
+
+    Dangling pages are taken to link to every page, as in
+    `transition_model`. Only pages whose links in or out changed are
+    updated at first. Each update uses the latest values of its parents,
+    as in Gauss-Seidel iteration, and a page whose rank moves by more
+    than `tolerance` times the average rank queues its links to be
+    updated in turn. Every page is requeued only if the share that all
+    pages receive, from random jumps and dangling pages, moves by as
+    much. The values are then divided by their total, so that they sum
+    to 1.
+
+    `tolerance` only decides which changes are passed on, so it is not
+    a bound on the error: the changes left unpropagated add up, and the
+    values can be several times `tolerance` from a full iteration's in
+    relative terms.
+    """
+    links = LinkGraph(corpus)
+    N = len(links)
+    threshold = tolerance / N
+    added_out = Counter(page for page, _ in diff["added_links"])
+    removed_out = Counter(page for page, _ in diff["removed_links"])
+
+    # Keep the old ranks, and start new pages at the least possible rank
+    pagerank = dict()
+    for page in links.pages:
+        if page in ranks and page not in diff["added_pages"]:
+            pagerank[page] = ranks[page]
+        else:
+            pagerank[page] = (1 - damping_factor) / N
+
+    # The share every page gets from random jumps and dangling pages,
+    # before the changes and now
+    old_share = None
+    if ranks:
+        old_mass = 0
+        for page, rank in ranks.items():
+            old_degree = links.out_degree.get(page, 0) - added_out[page] + removed_out[page]
+            if old_degree == 0:
+                old_mass += rank
+        old_share = ((1 - damping_factor) + damping_factor * old_mass) / len(ranks)
+    mass = sum(pagerank[page] for page in links.dangling())
+    share = ((1 - damping_factor) + damping_factor * mass) / N
+
+    if old_share is None or abs(share - old_share) > threshold:
+        dirty = list(links.pages)
+    else:
+        dirty = [page for page in diff["added_pages"] if page in pagerank]
+        for page, target in diff["added_links"] | diff["removed_links"]:
+            if target in pagerank:
+                dirty.append(target)
+            if page in corpus:
+                dirty.extend(corpus[page])
+    queue = deque(dict.fromkeys(dirty))
+    queued = set(queue)
+    settled = share
+
+    updates = 0
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        value = share + damping_factor * sum(
+            pagerank[parent] / links.out_degree[parent] for parent in links.inbound[page]
+        )
+        change = value - pagerank[page]
+        pagerank[page] = value
+        updates += 1
+
+        if links.out_degree[page] == 0:
+            mass += change
+            share = ((1 - damping_factor) + damping_factor * mass) / N
+            if abs(share - settled) > threshold:
+                settled = share
+                for other in links.pages:
+                    if other not in queued:
+                        queued.add(other)
+                        queue.append(other)
+        if abs(change) > threshold:
+            for link in corpus[page]:
+                if link not in queued:
+                    queued.add(link)
+                    queue.append(link)
+
+    total = sum(pagerank.values())
+    return {page: rank / total for page, rank in pagerank.items()}, updates
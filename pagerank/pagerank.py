@@ -1,51 +1,114 @@
-import os
+import argparse
 import random
-import re
-import sys
+
+import convergence
+import crawler
+import personalized
+import sampling
+import sparse
+from graph import LinkGraph
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# "python" iterates over dictionaries; "numpy" over link arrays, see sparse.py
+ENGINES = ("python", "numpy")
+
+# "transition" samples from transition_model at every step; "walk" steps in O(1), and
+# "parallel" runs many such walks across processes, see sampling.py
+SAMPLERS = ("transition", "walk", "parallel")
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(
+        usage="python pagerank.py corpus [--samples N] "
+              "[--sampler SAMPLER | --tolerance T [--confidence C]] "
+              "[--engine ENGINE | --solver SOLVER] [--seeds PAGE [PAGE ...]]..."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--samples", type=int, default=None)
+    sampler = parser.add_mutually_exclusive_group()
+    sampler.add_argument("--sampler", choices=SAMPLERS, default="transition",
+                         help="how to sample: through transition_model, by a fast random walk, "
+                              "or by many walks in parallel")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes for crawling and the parallel sampler "
+                             "(default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the parallel and adaptive samplers")
+    sampler.add_argument("--tolerance", type=float, default=None,
+                         help="instead of a fixed number of samples, sample by parallel walks "
+                              "until every PageRank is within this much of its estimate, or "
+                              "--samples if given comes first")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="confidence level for --tolerance")
+    iteration = parser.add_mutually_exclusive_group()
+    iteration.add_argument("--engine", choices=ENGINES, default="python",
+                           help="how to iterate: over dictionaries, or vectorized with NumPy")
+    iteration.add_argument("--solver", choices=convergence.SOLVERS, default=None,
+                           help="iterate with this solver, and report how far it converged")
+    parser.add_argument("--seeds", nargs="+", action="append", default=[], metavar="PAGE",
+                        help="also rank by personalized PageRank, jumping only to these pages; "
+                             "repeat for more seed sets, all ranked together")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse every page instead of reusing the links cached from last time")
+    args = parser.parse_args()
+    if args.tolerance is not None and args.samples is not None:
+        if args.samples < sampling.WALKERS:
+            parser.error(f"--samples must be at least {sampling.WALKERS} with --tolerance")
+    if args.sampler == "parallel" and args.samples is not None and args.samples < 2:
+        parser.error("--samples must be at least 2 for the parallel sampler")
+
+    corpus = crawl(args.corpus, processes=args.processes, use_cache=not args.no_cache)
+    n, errors = args.samples, None
+    if n is None and args.tolerance is None:
+        n = SAMPLES
+    if args.tolerance is not None:
+        ranks, errors, n = sampling.adaptive_pagerank(corpus, DAMPING, args.tolerance,
+                                                      args.confidence, max_samples=n,
+                                                      seed=args.seed)
+    elif args.sampler == "parallel":
+        ranks, errors = sampling.parallel_pagerank(corpus, DAMPING, n,
+                                                   processes=args.processes, seed=args.seed)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, n, method=args.sampler)
+    print(f"PageRank Results from Sampling (n = {n})")
     for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+        if errors is None:
+            print(f"  {page}: {ranks[page]:.4f}")
+        else:
+            print(f"  {page}: {ranks[page]:.4f} ± {errors[page]:.4f}")
+    if args.solver is not None:
+        solution = convergence.solve(corpus, DAMPING, args.solver)
+        ranks = solution.ranks
+        print(f"PageRank Results from Iteration ({solution.solver}: {solution.iterations} "
+              f"iterations, residual {solution.residual:.2e})")
+    else:
+        if args.engine == "numpy":
+            ranks = sparse.iterate_pagerank(corpus, DAMPING)
+        else:
+            ranks = iterate_pagerank(corpus, DAMPING)
+        print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    if args.seeds:
+        teleports = {", ".join(seeds): seeds for seeds in args.seeds}
+        for name, ranks in personalized_pagerank(corpus, DAMPING, teleports).items():
+            print(f"PageRank Results Personalized to {name}")
+            for page in sorted(ranks):
+                print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, processes=None, use_cache=True):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
-
-    return pages
+    Pages are parsed in parallel, and the links found are cached so that
+    only changed pages are parsed again; see crawler.py.
+    """
+    return crawler.crawl(directory, processes=processes, use_cache=use_cache)
 
 
 def transition_model(corpus, page, damping_factor):
@@ -102,16 +165,38 @@ def transition_model(corpus, page, damping_factor):
     return prob_distri
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, method="transition", tolerance=None,
+                    confidence=0.95):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    With `method` "walk", the same model is sampled in O(1) per page
+    from precomputed links, and visits are tallied as they happen;
+    "parallel" shares the samples among independent walks run across
+    processes.
+
+    Given a `tolerance`, the method is ignored and walks go on only
+    until every PageRank is within `tolerance` of its estimate at the
+    `confidence` level, or until `n` pages if that comes first; `n`
+    may then be None for no limit.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
 
+    # Hands off to the fast random walks if asked
+    if tolerance is not None:
+        return sampling.adaptive_pagerank(corpus, damping_factor, tolerance, confidence,
+                                          max_samples=n)[0]
+    if method == "walk":
+        return sampling.sample_pagerank(corpus, damping_factor, n)
+    if method == "parallel":
+        return sampling.parallel_pagerank(corpus, damping_factor, n)[0]
+    if method != "transition":
+        raise ValueError(f"unknown sampling method: {method!r}")
+
     # Initializes dictionary used to display page rankings
     pagerank = dict()
 
@@ -155,19 +240,29 @@ def sample_pagerank(corpus, damping_factor, n):
     return pagerank
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, solver=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Given one of the convergence.SOLVERS as `solver`, hand over to it
+    instead; convergence.solve also reports the iterations it took.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
 
+    # Hands off to another solver if asked
+    if solver is not None:
+        return convergence.solve(corpus, damping_factor, solver).ranks
+
     # Initializes dictionary used to display page rankings
     pagerank = dict()
 
+    # Indexes the pages linking to each page, and the number of links on each, once for every sweep
+    links = LinkGraph(corpus)
+
     # Initializes N to the total number of pages in the corpus
     N = len(corpus)
 
@@ -180,6 +275,9 @@ def iterate_pagerank(corpus, damping_factor):
         # Each page is initialized to the same probability of being picked
         pagerank[page] = prob_i
 
+    # Finds the pages with no links, which are treated as linking to every page including themselves
+    dangling_pages = links.dangling()
+
     # Initializes variable to track probabilty change, sets to 1 to ensure algorithm enters while loop
     prob_change = 1
 
@@ -189,53 +287,50 @@ def iterate_pagerank(corpus, damping_factor):
         # Establishes a copy of current pageranks to use to caculate the probability change after calculating the new pagerankings
         old_pagerank = pagerank.copy()
 
-        # Loops through each page in the corpus and calculates it's probability of being selected
-        for page in pagerank:
-
-            # Initializes an empty list to store the pages that house a link to another page
-            parent_pages = []
+        # Resets prob_change so it ends up as the largest change to any page in this sweep
+        prob_change = 0
 
-            # Loops through the corpus to determine the pages that link to the current page
-            for link in corpus:
+        # Calculates the probability of arriving at any page from a dangling page, which is the same for every page
+        dangling_condition = sum(old_pagerank[dangling_page] for dangling_page in dangling_pages) / N
 
-                # Checks If cuurent page is linked on a page
-                if page in corpus[link]:
+        # Loops through each page in the corpus and calculates it's probability of being selected
+        for page in pagerank:
 
-                    # If so then add page the current page is linked on to the parent_pages list
-                    parent_pages.append(link)
+            # Looks up the pages that house a link to the current page in the inbound index
+            parent_pages = links.inbound[page]
 
             # Initializes value of the first part of the iteration formula
             first_condition = (1 - damping_factor) / N
 
-            # Initializes an empty list to store the values used in the summation at the end of the iteration formula
-            second_condition = []
-
-            # Checks to make sure parent_pages is not empty
-            if len(parent_pages) != 0:
-
-                # If not then loop through each page in parent_pages
-                for parent_page in parent_pages:
+            # Sums the probability of arriving from each parent page: its old pagerank divided by the number of links it houses
+            second_condition = sum(
+                old_pagerank[parent_page] / links.out_degree[parent_page]
+                for parent_page in parent_pages
+            )
 
-                    # Initializes NumLinks to the number links housed on parent_page
-                    NumLinks = len(corpus[parent_page])
+            # Calculates the new pagerank using the iteration formula
+            pagerank[page] = first_condition + (damping_factor * (second_condition + dangling_condition))
 
-                    # Initializes the probability of selecting each linked page by dividing the old pagerank of the parent page by the number of links of the page
-                    probability = old_pagerank[parent_page] / NumLinks
+            # Keeps the largest change in probability so far, by subtracting the old probability from the new one and taking the absolute value
+            prob_change = max(prob_change, abs(pagerank[page] - old_pagerank[page]))
 
-                    # Adds the probability to second_condition
-                    second_condition.append(probability)
+    # Returns the final pagerank dictionary derived through iteration
+    return pagerank
 
-            # Reinitializes second_condition to the sum of all the values in second_condition
-            second_condition = sum(second_condition)
 
-            # Calculates the new pagerank using the iteration formula
-            pagerank[page] = first_condition + (damping_factor * second_condition)
+def personalized_pagerank(corpus, damping_factor, teleports):
+    """
+    Return personalized PageRank values for many teleport distributions
+    at once, such as one per topic or per user.
 
-            # Reassigns the value of prob_change by calculating the change in probability by subtracting th old probability from the new one and taking the absolute value
-            prob_change = abs(pagerank[page] - old_pagerank[page])
+    `teleports` maps each name to the pages the random surfer jumps to
+    instead of any page in the corpus, as a collection of seed pages or
+    a dictionary of pages to weights. All of them are iterated together
+    over one index of the corpus's links; see personalized.py.
 
-    # Returns the final pagerank dictionary derived through iteration
-    return pagerank
+    Return a dictionary from each name to a dictionary of page ranks.
+    """
+    return personalized.personalized_pagerank(corpus, damping_factor, teleports)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+import sparse
+from graph import LinkGraph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOLERANCE = 0.001
+
+
+def personalized_pagerank(corpus, damping_factor, teleports, tolerance=TOLERANCE):
+    """
+    Return personalized PageRank values for each of several teleport
+    distributions at once, iterating until no page's rank under any of
+    them changes by more than `tolerance` in a step.
+
+    `teleports` maps a name, such as a topic or a user, to where the
+    random surfer jumps for it: either a dictionary of pages to weights,
+    which need not sum to 1, or a collection of seed pages to jump to
+    uniformly. With probability `1 - damping_factor`, and from pages
+    without links, the surfer jumps by that distribution instead of
+    uniformly over the corpus; a uniform distribution gives the same
+    values as `iterate_pagerank`.
+
+    Every distribution is stepped together, as one row of a matrix of
+    ranks over one index of the links, a sparse.SparseCorpus or else
+    the numbered pages of a LinkGraph, so the corpus is indexed once
+    rather than once per distribution. Each step still sums the links
+    once per row. The matrix is stepped with NumPy where it is
+    installed.
+
+    Return a dictionary from each name in `teleports` to a dictionary
+    of page ranks, which sum to 1.
+    """
+    pages = list(corpus)
+    names = list(teleports)
+    if not names:
+        return {}
+    index = {page: i for i, page in enumerate(pages)}
+    vectors = [_teleport(teleports[name], index, name) for name in names]
+
+    if np is not None:
+        ranks = _iterate_numpy(corpus, vectors, damping_factor, tolerance)
+    else:
+        ranks = _iterate_python(corpus, vectors, damping_factor, tolerance)
+    return {name: dict(zip(pages, column)) for name, column in zip(names, ranks)}
+
+
+def _teleport(weights, index, name):
+    """
+    Return a teleport distribution as a list of probabilities in page
+    order.
+    """
+    if not isinstance(weights, dict):
+        weights = dict.fromkeys(weights, 1)
+    vector = [0.0] * len(index)
+    for page, weight in weights.items():
+        if page not in index:
+            raise ValueError(f"teleport {name!r} names a page not in the corpus: {page!r}")
+        if weight < 0:
+            raise ValueError(f"teleport {name!r} gives {page!r} a negative weight")
+        vector[index[page]] += weight
+    total = sum(vector)
+    if total <= 0:
+        raise ValueError(f"teleport {name!r} has no weight on any page")
+    return [weight / total for weight in vector]
+
+
+def _iterate_numpy(corpus, vectors, damping_factor, tolerance):
+    """
+    Return the rank vectors, one row per teleport, by stepping a K by N
+    matrix of ranks.
+    """
+    graph = sparse.SparseCorpus.from_corpus(corpus)
+    N = len(graph)
+    sources, targets = graph.sources, graph.targets
+    teleport = np.array(vectors)
+
+    ranks = teleport.copy()
+    while True:
+        # Rows are contiguous, so each is summed over the links with one
+        # bincount, faster than any reduction across the whole matrix
+        shares = ranks * graph.inverse_degree
+        linked = np.stack([np.bincount(targets, weights=row[sources], minlength=N)
+                           for row in shares])
+        mass = ranks[:, graph.dangling].sum(axis=1, keepdims=True)
+        new_ranks = damping_factor * linked + ((1 - damping_factor) + damping_factor * mass) * teleport
+        change = np.abs(new_ranks - ranks).max()
+        ranks = new_ranks
+        if change <= tolerance:
+            return ranks.tolist()
+
+
+def _iterate_python(corpus, vectors, damping_factor, tolerance):
+    """
+    Return the rank vectors, one row per teleport, by stepping a list of
+    K ranks for each page.
+    """
+    inbound, weight, dangling = LinkGraph(corpus).numbered()
+    teleport = list(zip(*vectors))
+    K = len(vectors)
+
+    ranks = [list(row) for row in teleport]
+    while True:
+        shares = [[rank * weight[page] for rank in row] for page, row in enumerate(ranks)]
+        mass = [sum(ranks[page][k] for page in dangling) for k in range(K)]
+        jump = [(1 - damping_factor) + damping_factor * m for m in mass]
+        new_ranks = []
+        for page, parents in enumerate(inbound):
+            linked = [sum(column) for column in zip(*(shares[parent] for parent in parents))] or [0] * K
+            new_ranks.append([
+                damping_factor * value + scale * probability
+                for value, scale, probability in zip(linked, jump, teleport[page])
+            ])
+        change = max(abs(new - old) for new_row, old_row in zip(new_ranks, ranks)
+                     for new, old in zip(new_row, old_row))
+        ranks = new_ranks
+        if change <= tolerance:
+            return [list(column) for column in zip(*ranks)]
@@ -0,0 +1,204 @@
+import math
+import multiprocessing
+import random
+from array import array
+from statistics import NormalDist
+
+# The walker shared with pool workers, set before they start
+_walker = None
+
+# Independent walks that the parallel and adaptive samplers run by default
+WALKERS = 16
+
+
+class Walker():
+    """
+    Random surfer over a corpus, with pages numbered in corpus order
+    and each page's links kept as a tuple of page numbers.
+
+    Each step follows a random link with probability `damping_factor`,
+    and otherwise, or from a page without links, jumps to a page chosen
+    uniformly from the whole corpus, just as `transition_model` says;
+    but it costs O(1) instead of building the whole distribution.
+    """
+
+    def __init__(self, corpus, damping_factor):
+        self.pages = list(corpus)
+        index = {page: i for i, page in enumerate(self.pages)}
+        self.links = [tuple(index[link] for link in corpus[page]) for page in self.pages]
+        self.damping_factor = damping_factor
+
+    def __len__(self):
+        return len(self.pages)
+
+    def walk(self, n, rng, counts=None, page=None):
+        """
+        Visit `n` pages, starting with `page`, or a random one if None,
+        and add one to `counts[p]` for each visit to page `p`.
+
+        Return the counts, a new list if none are given, and the page
+        the walk would step from next.
+        """
+        size = len(self.pages)
+        links = self.links
+        damping_factor = self.damping_factor
+        uniform = rng.random
+        if counts is None:
+            counts = [0] * size
+        if page is None:
+            page = int(uniform() * size)
+        for _ in range(n):
+            counts[page] += 1
+            out = links[page]
+            if out and uniform() < damping_factor:
+                page = out[int(uniform() * len(out))]
+            else:
+                page = int(uniform() * size)
+        return counts, page
+
+    def ranks(self, counts):
+        """
+        Return visit counts as a dictionary of page ranks.
+        """
+        total = sum(counts)
+        return {page: count / total for page, count in zip(self.pages, counts)}
+
+
+def sample_pagerank(corpus, damping_factor, n, seed=None):
+    """
+    Return PageRank values for each page by one random walk of `n`
+    pages, starting with a page at random, with its random numbers
+    drawn from `seed`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value. All PageRank values sum to 1.
+    """
+    walker = Walker(corpus, damping_factor)
+    counts, _ = walker.walk(n, random.Random(seed))
+    return walker.ranks(counts)
+
+
+def parallel_pagerank(corpus, damping_factor, n, walkers=WALKERS, processes=None, seed=0):
+    """
+    Return PageRank values for each page estimated from `walkers`
+    independent random walks of `n` pages between them, run across a
+    pool of `processes` workers, and the standard error of each value.
+
+    Walk `i` draws its random numbers from its own stream seeded by
+    `seed` and `i`, so the results depend on the arguments alone and
+    not on how many processes share the work. The standard errors come
+    from the spread of the walks' separate estimates. There are never
+    more walks than pages to sample, so that none is empty.
+
+    Return two dictionaries keyed by page name: the estimated PageRank
+    values, which sum to 1, and their standard errors.
+    """
+    walkers = min(walkers, n)
+    if walkers < 2:
+        raise ValueError("standard errors need at least two walkers")
+    walker = Walker(corpus, damping_factor)
+    lengths = [n // walkers + (i < n % walkers) for i in range(walkers)]
+    tasks = [(length, f"{seed}:{i}") for i, length in enumerate(lengths)]
+    counts = list(_map(walker, tasks, processes, (corpus, damping_factor)))
+    return estimate(walker, counts, lengths)
+
+
+def adaptive_pagerank(corpus, damping_factor, tolerance, confidence=0.95, walkers=WALKERS,
+                      max_samples=None, seed=0):
+    """
+    Return PageRank values for each page estimated to within
+    `tolerance` at the given `confidence`, sampling only as much as
+    that takes, and at most `max_samples` pages if given.
+
+    Independent walks, seeded as in parallel_pagerank, are extended
+    in rounds that double the samples taken so far. After each round,
+    every page's confidence interval is worked out from the spread of
+    the walks' estimates, but is never taken to be narrower than that
+    of a page visited independently with its least possible rank,
+    (1 - damping_factor) / N, so that rarely seen pages are not
+    trusted too early. Sampling stops once every interval is within
+    `tolerance` of its estimate.
+
+    Return the estimated PageRank values and their standard errors as
+    dictionaries keyed by page name, and the number of pages sampled.
+    """
+    if walkers < 2:
+        raise ValueError("standard errors need at least two walkers")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    walker = Walker(corpus, damping_factor)
+    floor = (1 - damping_factor) / len(walker)
+
+    rngs = [random.Random(f"{seed}:{i}") for i in range(walkers)]
+    counts = [[0] * len(walker) for _ in range(walkers)]
+    positions = [None] * walkers
+    lengths = [0] * walkers
+    batch = max(1000, len(walker))
+    if max_samples is not None:
+        if max_samples < walkers:
+            raise ValueError("max_samples must allow each walker at least one sample")
+        batch = min(batch, max_samples // walkers)
+    while True:
+        for i in range(walkers):
+            _, positions[i] = walker.walk(batch, rngs[i], counts[i], positions[i])
+            lengths[i] += batch
+        ranks, errors = estimate(walker, counts, lengths)
+
+        n = sum(lengths)
+        if all(z * max(errors[page], math.sqrt(max(rank, floor) * (1 - rank) / n)) <= tolerance
+               for page, rank in ranks.items()):
+            return ranks, errors, n
+
+        # Double the samples, unless that would go over the limit
+        batch = lengths[0]
+        if max_samples is not None:
+            batch = min(batch, (max_samples - n) // walkers)
+            if batch == 0:
+                return ranks, errors, n
+
+
+def estimate(walker, counts, lengths):
+    """
+    Combine the visit counts of independent walks of the given lengths
+    into PageRank values and their standard errors, as dictionaries.
+    """
+    total = sum(lengths)
+    walks = len(lengths)
+    ranks = {}
+    errors = {}
+    for page, visits in zip(walker.pages, zip(*counts)):
+        rates = [count / length for count, length in zip(visits, lengths)]
+        mean = sum(rates) / walks
+        variance = sum((rate - mean) ** 2 for rate in rates) / (walks - 1)
+        ranks[page] = sum(visits) / total
+        errors[page] = math.sqrt(variance / walks)
+    return ranks, errors
+
+
+def _map(walker, tasks, processes, arguments):
+    global _walker
+    if processes == 1:
+        _walker = walker
+        yield from map(_walk, tasks)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Forked workers share the walker's links copy-on-write
+        _walker = walker
+        context, initializer, initargs = multiprocessing.get_context("fork"), None, ()
+    else:
+        context, initializer, initargs = multiprocessing.get_context(), _start, arguments
+    with context.Pool(processes, initializer=initializer, initargs=initargs) as pool:
+        yield from pool.imap(_walk, tasks)
+
+
+def _start(corpus, damping_factor):
+    global _walker
+    _walker = Walker(corpus, damping_factor)
+
+
+def _walk(task):
+    length, seed = task
+    counts, _ = _walker.walk(length, random.Random(seed))
+    return array("q", counts)
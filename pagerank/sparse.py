@@ -0,0 +1,89 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOLERANCE = 0.001
+
+
+class SparseCorpus():
+    """
+    Link structure of a corpus as NumPy arrays, for vectorized PageRank.
+
+    Pages are numbered in corpus order. Link `i` runs from page
+    `sources[i]` to page `targets[i]`; `out_degree[p]` counts the links
+    on page `p`, and `dangling` lists the pages without any. As in
+    `transition_model`, a dangling page is taken to link to every page
+    in the corpus, itself included.
+    """
+
+    def __init__(self, pages, sources, targets):
+        self.pages = pages
+        self.sources = sources
+        self.targets = targets
+        self.out_degree = np.bincount(sources, minlength=len(pages))
+        self.dangling = np.flatnonzero(self.out_degree == 0)
+
+        # Each link carries 1 / out-degree of its page's rank; dangling
+        # pages have no links, so dividing by 1 there changes nothing
+        self.inverse_degree = 1 / np.maximum(self.out_degree, 1)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Number the pages of a `crawl` dictionary and list its links.
+        """
+        if np is None:
+            raise ImportError("the numpy engine needs NumPy installed")
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        links = sum(len(corpus[page]) for page in pages)
+        dtype = np.int32 if len(pages) < 2 ** 31 else np.int64
+        sources = np.repeat(
+            np.arange(len(pages), dtype=dtype),
+            np.fromiter((len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages))
+        )
+        targets = np.fromiter(
+            (index[link] for page in pages for link in corpus[page]), dtype=dtype, count=links
+        )
+        return cls(pages, sources, targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def step(self, ranks, damping_factor):
+        """
+        Return the ranks after one step of the random surfer from `ranks`.
+        """
+        n = len(self.pages)
+        shares = ranks * self.inverse_degree
+        linked = np.bincount(self.targets, weights=shares[self.sources], minlength=n)
+        dangling = ranks[self.dangling].sum() / n
+        return (1 - damping_factor) / n + damping_factor * (linked + dangling)
+
+    def ranks(self, ranks):
+        """
+        Return a rank vector as a dictionary of page ranks.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page by power iteration over the
+    whole rank vector at once, until no page's rank changes by more
+    than `tolerance` in a step.
+
+    Each step costs two passes over the links in NumPy, so corpora of
+    millions of pages are practical. Return a dictionary where keys
+    are page names, and values are their PageRank value. All PageRank
+    values sum to 1.
+    """
+    graph = SparseCorpus.from_corpus(corpus)
+    ranks = np.full(len(graph), 1 / len(graph))
+    while True:
+        new_ranks = graph.step(ranks, damping_factor)
+        change = np.abs(new_ranks - ranks).max()
+        ranks = new_ranks
+        if change <= tolerance:
+            return graph.ranks(ranks)
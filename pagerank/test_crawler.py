@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import crawler
+
+CORPORA = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), f"corpus{i}") for i in range(3)
+]
+
+
+class ParseTest(unittest.TestCase):
+    """
+    Parsing a page in chunks of any size must find the same links as
+    matching the whole page at once.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.chunk = crawler.CHUNK
+
+    def tearDown(self):
+        crawler.CHUNK = self.chunk
+        shutil.rmtree(self.directory)
+
+    def check(self, path):
+        with open(path) as f:
+            expected = set(crawler.LINK.findall(f.read()))
+        for size in range(1, 40):
+            crawler.CHUNK = size
+            self.assertEqual(crawler.parse(path), expected, f"chunk size {size}")
+
+    def write(self, text):
+        path = os.path.join(self.directory, "page.html")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_corpora(self):
+        for corpus in CORPORA:
+            for filename in os.listdir(corpus):
+                if filename.endswith(".html"):
+                    self.check(os.path.join(corpus, filename))
+
+    def test_less_than_in_tag(self):
+        self.check(self.write('<p>1 < 2</p><a title="x<y" href="z.html">z</a> <a href="w.html">'))
+
+    def test_tag_without_href(self):
+        self.check(self.write('<a name="top"><a\nclass="x" href="a.html"><a id=">" href="b.html">'))
+
+
+class CacheTest(unittest.TestCase):
+    """
+    A cache file that cannot be used must be ignored, not trusted.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copytree(CORPORA[0], self.directory, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns(crawler.CACHE_NAME))
+        self.expected = crawler.crawl(self.directory, processes=1, use_cache=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, pages):
+        with open(os.path.join(self.directory, crawler.CACHE_NAME), "w") as f:
+            json.dump({"version": crawler.CACHE_VERSION, "pages": pages}, f)
+
+    def test_round_trip(self):
+        crawler.crawl(self.directory, processes=1)
+        self.assertEqual(crawler.crawl(self.directory, processes=1), self.expected)
+
+    def test_malformed(self):
+        for pages in [[], {"1.html": []}, {"1.html": {"links": []}},
+                      {"1.html": {"key": [0, 0], "links": {}}},
+                      {"1.html": {"key": [0, 0], "links": [[]]}}]:
+            self.write(pages)
+            self.assertEqual(crawler.load_cache(self.directory), {})
+            self.write(pages)
+            self.assertEqual(crawler.crawl(self.directory, processes=1), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()